@@ -1,67 +1,211 @@
-import requests
-from bs4 import BeautifulSoup
+import os
+import sys
+import time
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup, SoupStrainer
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.font_manager import FontProperties
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from crawl_utils import create_session, RateLimiter, HostLimiter, fetch_concurrently, default_cache, month_cache_policy
 
-# 定义爬取单个月份天气数据的函数
-def crawl_weather_data(year, month):
-    url = f"https://www.tianqihoubao.com/lishi/dalian/month/{year}{month:02d}.html"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0'
-    }
-    response = requests.get(url, headers=headers)
-    soup = BeautifulSoup(response.text, 'html.parser')
+headers = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0'
+}
+
+# 页面解析后端：'html.parser'（原实现）、'lxml'、'strainer'（只解析天气表格）、'stream'（流式提取表格行）
+PARSER_BACKEND = 'stream'
+PARSER_BACKENDS = ['html.parser', 'lxml', 'strainer', 'stream']
+
+
+class WeatherTableExtractor(HTMLParser):
+    """流式提取weather-table表格中的单元格文本，不构建整棵文档树
+
+    缺少</td>或</tr>时，与html.parser、lxml建树时一样由下一个<td>、<tr>或</tr>、</table>隐式关闭；
+    单元格不是4个的行记入dropped，不会悄悄丢弃。
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.table_depth = 0
+        self.row = None
+        self.cell = None
+        self.tr_count = 0
+        self.rows = []
+        self.dropped = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            if self.table_depth:
+                self.table_depth += 1
+            elif 'weather-table' in (dict(attrs).get('class') or '').split():
+                self.table_depth = 1
+        elif not self.table_depth:
+            return
+        elif tag == 'tr':
+            self.end_row()
+            self.tr_count += 1
+            self.row = [] if self.tr_count > 1 else None  # 跳过表头
+        elif tag == 'td' and self.row is not None:
+            self.end_cell()
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        if not self.table_depth:
+            return
+        if tag == 'table':
+            if self.table_depth == 1:
+                self.end_row()
+            self.table_depth -= 1
+        elif tag == 'td':
+            self.end_cell()
+        elif tag == 'tr':
+            self.end_row()
+
+    def end_cell(self):
+        if self.cell is not None:
+            self.row.append(''.join(self.cell))
+            self.cell = None
+
+    def end_row(self):
+        self.end_cell()
+        if self.row is not None:
+            (self.rows if len(self.row) == 4 else self.dropped).append(self.row)
+            self.row = None
+
+    def handle_data(self, data):
+        if self.cell is not None:
+            self.cell.append(data)
+
+
+def warn_dropped(rows, dropped):
+    """有单元格个数不对的行被跳过时给出警告，原样返回rows"""
+    if dropped:
+        print(f"警告: 天气表格中有 {dropped} 行不是4个单元格，已跳过")
+    return rows
+
+
+def extract_weather_rows(html, backend=PARSER_BACKEND):
+    """返回天气表格中每一行（跳过表头）4个单元格的文本，单元格个数不对的行跳过并给出警告"""
+    if backend == 'stream':
+        extractor = WeatherTableExtractor()
+        extractor.feed(html)
+        extractor.close()
+        extractor.end_row()
+        return warn_dropped(extractor.rows, len(extractor.dropped))
+
+    if backend == 'strainer':
+        # 只保留<table>子树，其余节点在解析时直接丢弃
+        soup = BeautifulSoup(html, 'lxml', parse_only=SoupStrainer('table'))
+    else:
+        soup = BeautifulSoup(html, backend)
 
     # 找到天气数据表格
     table = soup.find('table', class_='weather-table')
     rows = table.find_all('tr')[1:]  # 跳过表头
+    cells = [[td.text for td in row.find_all('td')] for row in rows]
+    kept = [cols for cols in cells if len(cols) == 4]
+    return warn_dropped(kept, len(cells) - len(kept))
+
+
+def benchmark_parsers(html, repeat=5):
+    """比较各解析后端处理同一页面的平均耗时"""
+    baseline = extract_weather_rows(html, 'html.parser')
+    for backend in PARSER_BACKENDS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            rows = extract_weather_rows(html, backend)
+        elapsed = (time.perf_counter() - start) / repeat
+        same = [[c.strip() for c in r] for r in rows] == [[c.strip() for c in r] for r in baseline]
+        print(f"{backend:12s} {elapsed * 1000:8.2f} ms/页  结果一致: {same}")
+
+
+# 定义爬取单个月份天气数据的函数
+def crawl_weather_data(year, month, session=None, rate_limiter=None, host_limiter=None):
+    url = f"https://www.tianqihoubao.com/lishi/dalian/month/{year}{month:02d}.html"
+    response = default_cache.get(url, session=session, headers=headers, **month_cache_policy(year, month),
+                                 rate_limiter=rate_limiter, host_limiter=host_limiter)
+    # 4xx/5xx页面没有天气表格，直接报错而不是解析出空数据
+    response.raise_for_status()
 
     data = []
-    for row in rows:
-        cols = row.find_all('td')
-        if len(cols) == 4:
-            date = cols[0].text.strip()
-            weather = cols[1].text.strip().split('/')
-            temp = cols[2].text.strip().split('/')
-            wind = cols[3].text.strip().split('/')
-
-            # 检查分割后的列表长度
-            day_weather = weather[0].strip() if len(weather) > 0 else ''
-            night_weather = weather[1].strip() if len(weather) > 1 else ''
-            max_temp = temp[0].strip('℃ ') if len(temp) > 0 else ''
-            min_temp = temp[1].strip('℃ ') if len(temp) > 1 else ''
-            day_wind = wind[0].strip() if len(wind) > 0 else ''
-            night_wind = wind[1].strip() if len(wind) > 1 else ''
-
-            data.append({
-                '日期': date,
-                '白天天气': day_weather,
-                '夜间天气': night_weather,
-                '最高气温(℃)': max_temp,
-                '最低气温(℃)': min_temp,
-                '白天风力风向': day_wind,
-                '夜间风力风向': night_wind
-            })
+    for cols in extract_weather_rows(response.text):
+        date = cols[0].strip()
+        weather = cols[1].strip().split('/')
+        temp = cols[2].strip().split('/')
+        wind = cols[3].strip().split('/')
+
+        # 检查分割后的列表长度
+        day_weather = weather[0].strip() if len(weather) > 0 else ''
+        night_weather = weather[1].strip() if len(weather) > 1 else ''
+        max_temp = temp[0].strip('℃ ') if len(temp) > 0 else ''
+        min_temp = temp[1].strip('℃ ') if len(temp) > 1 else ''
+        day_wind = wind[0].strip() if len(wind) > 0 else ''
+        night_wind = wind[1].strip() if len(wind) > 1 else ''
+
+        data.append({
+            '日期': date,
+            '白天天气': day_weather,
+            '夜间天气': night_weather,
+            '最高气温(℃)': max_temp,
+            '最低气温(℃)': min_temp,
+            '白天风力风向': day_wind,
+            '夜间风力风向': night_wind
+        })
 
     return data
 
 
-# 爬取2022年到2024年的天气数据
-all_data = []
-for year in range(2022, 2025):
-    for month in range(1, 13):
+# 并发爬取多个月份：共用一个连接池会话，限制单主机并发数和请求速率
+def crawl_weather_concurrent(months, max_workers=8, per_host=4, rate=5):
+    session = create_session(pool_size=max_workers)
+    rate_limiter = RateLimiter(rate, burst=per_host)
+    host_limiter = HostLimiter(per_host)
+
+    def crawl(year, month):
+        print(f"爬取{year}年{month}月的数据...")
+        return crawl_weather_data(year, month, session, rate_limiter, host_limiter)
+
+    # 结果按months顺序返回，保证与串行爬取的CSV完全一致
+    results = fetch_concurrently(crawl, months, max_workers=max_workers)
+    all_data = []
+    for month_data in results:
+        all_data.extend(month_data)
+    return all_data
+
+
+def crawl_weather(months, concurrent=True):
+    """按months顺序爬取各月数据，concurrent为False时逐月串行爬取（便于调试或对方限流时使用）"""
+    if concurrent:
+        return crawl_weather_concurrent(months)
+
+    all_data = []
+    for year, month in months:
         print(f"爬取{year}年{month}月的数据...")
         month_data = crawl_weather_data(year, month)
         all_data.extend(month_data)
+    return all_data
+
+
+if __name__ == "__main__" and '--benchmark' in sys.argv:
+    # 用一个月的页面比较各解析后端的耗时
+    page = default_cache.get("https://www.tianqihoubao.com/lishi/dalian/month/202201.html",
+                             headers=headers, **month_cache_policy(2022, 1))
+    benchmark_parsers(page.text)
+
+elif __name__ == "__main__":
+    # 爬取2022年到2024年的天气数据
+    months = [(year, month) for year in range(2022, 2025) for month in range(1, 13)]
+    # 默认并发爬取，--serial时逐月串行爬取
+    all_data = crawl_weather(months, concurrent='--serial' not in sys.argv)
 
-# 将数据转换为DataFrame
-df = pd.DataFrame(all_data)
+    # 将数据转换为DataFrame
+    df = pd.DataFrame(all_data)
 
-# 保存数据到CSV文件
-df.to_csv('dalian_weather_2022_2024.csv', index=False, encoding='utf-8')
+    # 保存数据到CSV文件
+    df.to_csv('dalian_weather_2022_2024.csv', index=False, encoding='utf-8')
 
-print("数据爬取完成并保存到CSV文件中。")
+    print("数据爬取完成并保存到CSV文件中。")
 
 
@@ -1,4 +1,8 @@
-import requests
+import calendar
+import json
+import os
+import sys
+from datetime import date
 from bs4 import BeautifulSoup
 import pandas as pd
 from sklearn.linear_model import LinearRegression
@@ -6,12 +10,16 @@ from sklearn.model_selection import train_test_split
 import matplotlib.pyplot as plt
 from matplotlib.font_manager import FontProperties
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from crawl_utils import default_cache, month_cache_policy
+
+
 def fetch_weather_data(year, month):
     url = f"https://www.tianqihoubao.com/lishi/dalian/month/{year}{month:02d}.html"
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0'
     }
-    response = requests.get(url, headers=headers)
+    response = default_cache.get(url, headers=headers, **month_cache_policy(year, month))
     soup = BeautifulSoup(response.text, 'html.parser')
 
     # 找到天气数据表格
@@ -39,69 +47,156 @@ def fetch_weather_data(year, month):
     return data
 
 
-# 爬取2025年1-6月的数据
-weather_data_2025 = {}
-for month in range(1, 7):
-    weather_data_2025[month] = fetch_weather_data(2025, month)
-    weather_data_2025[month] = pd.DataFrame(weather_data_2025[month])
-
-# 保存数据到CSV文件
-weather_data_2025 = pd.concat(weather_data_2025.values(), ignore_index=True)
-weather_data_2025.to_csv('dalian_weather_2025.csv', index=False)
-
-# 设置中文字体，这里使用的是Windows系统中常见的宋体
-font = FontProperties(fname='C:/Windows/Fonts/simsun.ttc', size=14)
-
-# 读取CSV文件
-data_2022_2024 = pd.read_csv('dalian_weather_2022_2024.csv')
-data_2025 = pd.read_csv('dalian_weather_2025.csv')
-
-# 合并数据
-data = pd.concat([data_2022_2024, data_2025], ignore_index=True)
-
-# 将日期列转换为datetime类型，指定日期格式
-data['日期'] = pd.to_datetime(data['日期'], format='%Y年%m月%d日', errors='coerce')
-
-# 提取年份和月份
-data['年'] = data['日期'].dt.year
-data['月'] = data['日期'].dt.month
-
-# 计算每个月的平均最高温度
-monthly_avg_temp = data.groupby(['年', '月'])['最高气温(℃)'].mean().reset_index()
-
-# 准备特征和标签
-X = monthly_avg_temp[['年', '月']]
-y = monthly_avg_temp['最高气温(℃)']
-
-# 划分训练集和测试集
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# 创建线性回归模型
-model = LinearRegression()
-
-# 训练模型
-model.fit(X_train, y_train)
-
-# 预测2025年1-6月的温度
-future_months = pd.DataFrame({
-    '年': [2025]*6,
-    '月': list(range(1, 7))
-})
-
-predicted_temps = model.predict(future_months)
+# 按月分区存储的天气数据目录，每个月一个CSV文件；各分区的抓取日期记录在旁边的fetched.json中
+store_dir = 'dalian_weather_store'
+fetched_file = os.path.join(store_dir, 'fetched.json')
+start_month = (2022, 1)
+end_month = (2025, 6)  # 与原脚本使用的数据范围一致：2022年1月至2025年6月
+
+
+def partition_path(year, month):
+    return os.path.join(store_dir, f'{year}-{month:02d}.csv')
+
+
+def next_month_start(year, month):
+    return date(year + month // 12, month % 12 + 1, 1)
+
+
+def load_fetched():
+    """{'2024-05': '2024-06-03', ...}：各分区数据的抓取日期，未知时为None"""
+    try:
+        with open(fetched_file, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
 
-# 绘制真实结果和预测结果的对比图
-plt.figure(figsize=(10, 6))
-plt.plot(monthly_avg_temp['月'], monthly_avg_temp['最高气温(℃)'], label='真实温度', marker='o')
-plt.plot(future_months['月'], predicted_temps, label='预测温度', linestyle='--', marker='x', color='red')
-plt.xlabel('月份', fontproperties=font)
-plt.ylabel('平均最高温度 (℃)', fontproperties=font)
-plt.title('大连市温度预测', fontproperties=font)
-plt.legend(prop=font)
-plt.grid(True)
+def save_fetched(fetched):
+    tmp_path = fetched_file + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(fetched, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, fetched_file)
 
-# 保存图形
-plt.savefig('temperature_prediction.png', bbox_inches='tight')
 
-# 显示图形
-plt.show()
+def bootstrap_store(csv_files):
+    """首次运行时把已有的整体CSV拆分成按月分区
+
+    原CSV的抓取日期未知，只有包含该月每一天的分区才记为已结束（抓取日期取下月1日），
+    缺天的月份（例如在月中抓取）不记抓取日期，之后会重新获取。
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    if any(name.endswith('.csv') for name in os.listdir(store_dir)):
+        return
+    fetched = {}
+    for csv_file in csv_files:
+        if not os.path.exists(csv_file):
+            continue
+        df = pd.read_csv(csv_file)
+        dates = pd.to_datetime(df['日期'], format='%Y年%m月%d日', errors='coerce')
+        for (year, month), part in df.groupby([dates.dt.year, dates.dt.month]):
+            year, month = int(year), int(month)
+            part.to_csv(partition_path(year, month), index=False)
+            days = dates[part.index].dt.day.nunique()
+            complete = days == calendar.monthrange(year, month)[1]
+            fetched[f'{year}-{month:02d}'] = next_month_start(year, month).isoformat() if complete else None
+    save_fetched(fetched)
+
+
+def is_partition_open(year, month, fetched):
+    """分区抓取时该月还没结束（包括当月）或抓取日期未知，说明数据可能不完整，需要重新获取"""
+    fetched_on = fetched.get(f'{year}-{month:02d}')
+    return fetched_on is None or date.fromisoformat(fetched_on) < next_month_start(year, month)
+
+
+def missing_partitions(end=end_month, today=None):
+    """找出start_month到end（不晚于当月）之间缺失或仍未结束的(年, 月)分区"""
+    today = today or date.today()
+    end = min(end, (today.year, today.month))
+    fetched = load_fetched()
+    year, month = start_month
+    result = []
+    while (year, month) <= end:
+        if not os.path.exists(partition_path(year, month)) or is_partition_open(year, month, fetched):
+            result.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return result
+
+
+def incremental_update(end=end_month):
+    """只爬取end之前缺失或未结束的月份，并写入对应分区"""
+    bootstrap_store(['dalian_weather_2022_2024.csv', 'dalian_weather_2025.csv'])
+    todo = missing_partitions(end)
+    fetched = load_fetched()
+    for year, month in todo:
+        print(f"爬取{year}年{month}月的数据...")
+        pd.DataFrame(fetch_weather_data(year, month)).to_csv(partition_path(year, month), index=False)
+        fetched[f'{year}-{month:02d}'] = date.today().isoformat()
+        save_fetched(fetched)
+    return todo
+
+
+def load_weather_store(end=end_month):
+    """合并start_month到end之间的分区，按日期顺序返回数据集"""
+    names = {f'{year}-{month:02d}.csv' for year in range(start_month[0], end[0] + 1) for month in range(1, 13)
+             if start_month <= (year, month) <= end}
+    files = sorted(f for f in os.listdir(store_dir) if f in names)
+    return pd.concat([pd.read_csv(os.path.join(store_dir, f)) for f in files], ignore_index=True)
+
+
+if __name__ == "__main__":
+    # 增量更新：只请求end_month之前缺失或未结束的月份
+    updated = incremental_update()
+    print(f"本次更新了 {len(updated)} 个月份的数据")
+
+    # 设置中文字体，这里使用的是Windows系统中常见的宋体
+    font = FontProperties(fname='C:/Windows/Fonts/simsun.ttc', size=14)
+
+    # 读取2022年1月至2025年6月的分区数据（与原脚本的训练数据相同）
+    data = load_weather_store()
+
+    # 将日期列转换为datetime类型，指定日期格式
+    data['日期'] = pd.to_datetime(data['日期'], format='%Y年%m月%d日', errors='coerce')
+
+    # 提取年份和月份
+    data['年'] = data['日期'].dt.year
+    data['月'] = data['日期'].dt.month
+
+    # 计算每个月的平均最高温度
+    monthly_avg_temp = data.groupby(['年', '月'])['最高气温(℃)'].mean().reset_index()
+
+    # 准备特征和标签
+    X = monthly_avg_temp[['年', '月']]
+    y = monthly_avg_temp['最高气温(℃)']
+
+    # 划分训练集和测试集
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    # 创建线性回归模型
+    model = LinearRegression()
+
+    # 训练模型
+    model.fit(X_train, y_train)
+
+    # 预测2025年1-6月的温度
+    future_months = pd.DataFrame({
+        '年': [2025]*6,
+        '月': list(range(1, 7))
+    })
+
+    predicted_temps = model.predict(future_months)
+
+    # 绘制真实结果和预测结果的对比图
+    plt.figure(figsize=(10, 6))
+    plt.plot(monthly_avg_temp['月'], monthly_avg_temp['最高气温(℃)'], label='真实温度', marker='o')
+    plt.plot(future_months['月'], predicted_temps, label='预测温度', linestyle='--', marker='x', color='red')
+    plt.xlabel('月份', fontproperties=font)
+    plt.ylabel('平均最高温度 (℃)', fontproperties=font)
+    plt.title('大连市温度预测', fontproperties=font)
+    plt.legend(prop=font)
+    plt.grid(True)
+
+    # 保存图形
+    plt.savefig('temperature_prediction.png', bbox_inches='tight')
+
+    # 显示图形
+    plt.show()
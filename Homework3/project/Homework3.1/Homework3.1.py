@@ -1,46 +1,251 @@
+import os
+import sys
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import csv
+from datetime import date
+from html.parser import HTMLParser
 from urllib.parse import urljoin
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawl_utils import RateLimiter, default_cache
+from paper_store import ParquetPaperSink, import_csv_dir
+
+DBLP_BASE_URL = "https://dblp.org/db/"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+}
+
+# 会议注册表：会议简称 -> (起始年份, 未举办的年份, 由年份生成DBLP论文集页面路径的规则)
+# 起始年份取DBLP页面采用 conf/<会议>/<会议><四位年份>.html 单页格式的年份，更早的页面使用两位年份或分卷命名，不在规则内；
+# ECCV、ACL等论文集在DBLP上按卷拆分成多个页面（如 eccv2020-1.html），也不适用单页规则，未收录
+VENUE_RULES = {
+    # IJCAI 2015年以前隔年（奇数年）举办，2015年起每年举办
+    "ijcai": (2005, frozenset(range(2006, 2015, 2)), lambda year: f"conf/ijcai/ijcai{year}"),
+    "nips": (2005, frozenset(), lambda year: f"conf/nips/neurips{year}" if year >= 2020 else f"conf/nips/nips{year}"),
+    # AAAI 2009年停办（当年IJCAI在北美举办），2010年起每年举办
+    "aaai": (2005, frozenset({2009}), lambda year: f"conf/aaai/aaai{year}"),
+    "cvpr": (2005, frozenset(), lambda year: f"conf/cvpr/cvpr{year}"),
+    "icml": (2005, frozenset(), lambda year: f"conf/icml/icml{year}"),
+    # ICCV 奇数年举办
+    "iccv": (2005, frozenset(range(2006, 2100, 2)), lambda year: f"conf/iccv/iccv{year}"),
+    "iclr": (2013, frozenset(), lambda year: f"conf/iclr/iclr{year}"),
+    "kdd": (2005, frozenset(), lambda year: f"conf/kdd/kdd{year}"),
+    "sigir": (2005, frozenset(), lambda year: f"conf/sigir/sigir{year}"),
+    "www": (2005, frozenset(), lambda year: f"conf/www/www{year}"),
+}
+
+
+def dblp_url(venue, year):
+    """按注册表规则生成指定会议和年份的DBLP页面URL，不支持或该年没有论文集（含未来年份）时返回None"""
+    if venue not in VENUE_RULES:
+        return None
+    first_year, missing_years, rule = VENUE_RULES[venue]
+    if year < first_year or year in missing_years or year > date.today().year:
+        return None
+    return f"{DBLP_BASE_URL}{rule(year)}.html"
+
+
+def build_conferences(years, venues=None):
+    """生成 {会议: {年份: URL}} 形式的会议表"""
+    table = {}
+    for venue in venues or VENUE_RULES:
+        urls = {year: dblp_url(venue, year) for year in years}
+        table[venue] = {year: url for year, url in urls.items() if url}
+    return table
+
+
 # 定义所有会议及其URL
-conferences = {
-    "ijcai": {
-        2020: "https://dblp.org/db/conf/ijcai/ijcai2020.html",
-        2021: "https://dblp.org/db/conf/ijcai/ijcai2021.html",
-        2022: "https://dblp.org/db/conf/ijcai/ijcai2022.html",
-        2023: "https://dblp.org/db/conf/ijcai/ijcai2023.html",
-        2024: "https://dblp.org/db/conf/ijcai/ijcai2024.html"
-    },
-    "nips": {
-        2020: "https://dblp.org/db/conf/nips/neurips2020.html",
-        2021: "https://dblp.org/db/conf/nips/neurips2021.html",
-        2022: "https://dblp.org/db/conf/nips/neurips2022.html",
-        2023: "https://dblp.org/db/conf/nips/neurips2023.html",
-        2024: "https://dblp.org/db/conf/nips/neurips2024.html"
-    },
-    "aaai": {
-        2020: "https://dblp.org/db/conf/aaai/aaai2020.html",
-        2021: "https://dblp.org/db/conf/aaai/aaai2021.html",
-        2022: "https://dblp.org/db/conf/aaai/aaai2022.html",
-        2023: "https://dblp.org/db/conf/aaai/aaai2023.html",
-        2024: "https://dblp.org/db/conf/aaai/aaai2024.html",
-    },
-    "cvpr": {
-        2020: "https://dblp.org/db/conf/cvpr/cvpr2020.html",
-        2021: "https://dblp.org/db/conf/cvpr/cvpr2021.html",
-        2022: "https://dblp.org/db/conf/cvpr/cvpr2022.html",
-        2023: "https://dblp.org/db/conf/cvpr/cvpr2023.html",
-        2024: "https://dblp.org/db/conf/cvpr/cvpr2024.html"
-    },
-    "icml": {
-        2020: "https://dblp.org/db/conf/icml/icml2020.html",
-        2021: "https://dblp.org/db/conf/icml/icml2021.html",
-        2022: "https://dblp.org/db/conf/icml/icml2022.html",
-        2023: "https://dblp.org/db/conf/icml/icml2023.html",
-        2024: "https://dblp.org/db/conf/icml/icml2024.html"
+conferences = build_conferences(range(2020, 2025))
+
+# 按会议和年份分区的Parquet论文数据集
+PAPER_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'papers_dataset')
+
+
+# 页面解析后端：'html.parser'（原实现）、'lxml'、'strainer'（只解析标题和论文条目）、'stream'（流式提取论文条目）
+PARSER_BACKEND = 'stream'
+PARSER_BACKENDS = ['html.parser', 'lxml', 'strainer', 'stream']
+
+
+class DblpEntryExtractor(HTMLParser):
+    """流式提取DBLP页面中的会议名称和论文条目，不构建整棵文档树
+
+    可以分块调用feed()，每解析完一个论文条目就追加到entries中，调用方可随时取走。
+    """
+
+    VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []  # 已打开的标签及其角色
+        self.active = {}  # 各角色当前打开的层数
+        self.headline_parts = None
+        self.headline_done = False
+        self.entry = None
+        self.name_parts = None
+        self.entries = []
+
+    @property
+    def conference_title(self):
+        if self.headline_parts is None:
+            return None
+        return ''.join(part.strip() for part in self.headline_parts)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        role = None
+        if tag == 'header' and attrs.get('id') == 'headline':
+            role = 'headline'
+        elif tag == 'h1' and self.active.get('headline') and self.headline_parts is None:
+            role = 'h1'
+            self.headline_parts = []
+        elif tag == 'li' and attrs.get('class') == 'entry inproceedings' and self.entry is None:
+            role = 'entry'
+            self.entry = {'title': None, 'authors': [], 'link': None}
+        elif self.entry is not None:
+            if tag == 'span' and self.entry['title'] is None and 'title' in (attrs.get('class') or '').split():
+                role = 'title'
+                self.entry['title'] = []
+            elif tag == 'span' and attrs.get('itemprop') == 'author':
+                role = 'author'
+            elif tag == 'span' and attrs.get('itemprop') == 'name' and self.active.get('author'):
+                role = 'name'
+                self.name_parts = []
+            elif tag == 'a' and attrs.get('href') and self.entry['link'] is None:
+                self.entry['link'] = attrs['href']
+
+        if tag in self.VOID_TAGS:
+            return
+        self.stack.append((tag, role))
+        if role:
+            self.active[role] = self.active.get(role, 0) + 1
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > i:
+            self._close(self.stack.pop()[1])
+
+    def _close(self, role):
+        if not role:
+            return
+        self.active[role] -= 1
+        if role == 'name' and self.name_parts is not None:
+            self.entry['authors'].append(''.join(self.name_parts).strip())
+            self.name_parts = None
+        elif role == 'entry':
+            if self.entry['title'] is not None:
+                self.entry['title'] = ''.join(self.entry['title']).strip()
+                self.entries.append(self.entry)
+            self.entry = None
+
+    def handle_data(self, data):
+        if self.active.get('h1'):
+            self.headline_parts.append(data)
+        if self.active.get('title'):
+            self.entry['title'].append(data)
+        if self.active.get('name'):
+            self.name_parts.append(data)
+
+    def close(self):
+        super().close()
+        while self.stack:
+            self._close(self.stack.pop()[1])
+
+
+def make_paper(entry, url, conference_title, year):
+    """由解析出的条目生成论文字典"""
+    return {
+        'title': entry['title'],
+        'authors': ', '.join(entry['authors']),
+        'conference_name': conference_title,
+        'conference_year': str(year),
+        'link': urljoin(url, entry['link']) if entry['link'] else None  # 转换为完整URL
     }
-}
+
+
+def parse_conference_page(markup, url, conference, year, backend=PARSER_BACKEND):
+    """解析DBLP会议页面，返回论文列表"""
+    if backend == 'stream':
+        if isinstance(markup, bytes):
+            markup = markup.decode('utf-8', errors='replace')
+        extractor = DblpEntryExtractor()
+        extractor.feed(markup)
+        extractor.close()
+        conference_title = extractor.conference_title or conference.upper()
+        return [make_paper(entry, url, conference_title, year) for entry in extractor.entries]
+
+    if backend == 'strainer':
+        # 只保留<header>和<li>子树，其余节点在解析时直接丢弃
+        soup = BeautifulSoup(markup, 'lxml', parse_only=SoupStrainer(['header', 'li']))
+    else:
+        soup = BeautifulSoup(markup, backend)
+
+    # 查找会议名称
+    header_tag = soup.find('header', id='headline')
+    conference_title = header_tag.find('h1').get_text(strip=True) if header_tag else conference.upper()
+
+    # 查找所有论文部分
+    paper_entries = soup.find_all('li', class_='entry inproceedings')
+
+    papers = []
+
+    # 遍历每个论文条目
+    for entry in paper_entries:
+        # 提取标题
+        title_tag = entry.find('span', class_='title')
+        if not title_tag:
+            continue
+        title = title_tag.get_text().strip()
+
+        # 提取作者
+        authors = []
+        for author_tag in entry.find_all('span', itemprop='author'):
+            for name_tag in author_tag.find_all('span', itemprop='name'):
+                authors.append(name_tag.get_text().strip())
+
+        # 提取链接
+        links = entry.find_all('a', href=True)
+        link = None
+        for a_tag in links:
+            if a_tag.get('href'):
+                link = a_tag['href']
+                break  # 只取第一个链接
+
+        papers.append(make_paper({'title': title, 'authors': authors, 'link': link}, url, conference_title, year))
+
+    return papers
+
+
+def benchmark_parsers(markup, url, repeat=5):
+    """比较各解析后端处理同一页面的平均耗时"""
+    baseline = parse_conference_page(markup, url, 'dblp', 0, 'html.parser')
+    for backend in PARSER_BACKENDS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            papers = parse_conference_page(markup, url, 'dblp', 0, backend)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{backend:12s} {elapsed * 1000:8.2f} ms/页  {len(papers)} 篇  结果一致: {papers == baseline}")
+
+
+def fetch_proceedings_page(url, year, rate_limiter=None):
+    """获取论文集页面（往年会议论文集不会再变化，永久缓存；当年的每天重新验证）"""
+    ttl = 24 * 3600 if year >= date.today().year else None
+    return default_cache.get(url, headers=HEADERS, ttl=ttl, rate_limiter=rate_limiter)
 
 
 def fetch_conference_papers(conference, year):
@@ -51,61 +256,12 @@ def fetch_conference_papers(conference, year):
 
     url = conferences[conference][year]
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-    }
-
     try:
-        # 发送HTTP请求
-        response = requests.get(url, headers=headers)
+        response = fetch_proceedings_page(url, year)
         response.raise_for_status()  # 检查请求是否成功
 
         # 解析HTML内容
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # 查找会议名称
-        header_tag = soup.find('header', id='headline')
-        conference_title = header_tag.find('h1').get_text(strip=True) if header_tag else conference.upper()
-
-        # 查找所有论文部分
-        paper_entries = soup.find_all('li', class_='entry inproceedings')
-
-        papers = []
-
-        # 遍历每个论文条目
-        for entry in paper_entries:
-            # 提取标题
-            title_tag = entry.find('span', class_='title')
-            if not title_tag:
-                continue
-            title = title_tag.get_text().strip()
-
-            # 提取作者
-            authors = []
-            for author_tag in entry.find_all('span', itemprop='author'):
-                for name_tag in author_tag.find_all('span', itemprop='name'):
-                    authors.append(name_tag.get_text().strip())
-
-            # 提取链接
-            links = entry.find_all('a', href=True)
-            link = None
-            for a_tag in links:
-                if a_tag.get('href'):
-                    link = urljoin(url, a_tag['href'])  # 转换为完整URL
-                    break  # 只取第一个链接
-
-            # 创建论文字典
-            paper = {
-                'title': title,
-                'authors': ', '.join(authors),
-                'conference_name': conference_title,
-                'conference_year': str(year),
-                'link': link
-            }
-
-            papers.append(paper)
-
-        return papers
+        return parse_conference_page(response.content, url, conference, year)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching papers for {conference} {year}: {e}")
         return []
@@ -114,31 +270,165 @@ def fetch_conference_papers(conference, year):
         return []
 
 
+CSV_FIELDS = ['title', 'authors', 'conference_name', 'conference_year', 'link']
+
+
 def save_papers_to_csv(papers, filename):
     """保存论文列表到CSV文件"""
     if not papers:
         return
 
-    # 定义CSV文件头
-    headers = ['title', 'authors', 'conference_name', 'conference_year', 'link']
-
     # 写入CSV文件
     with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=headers)
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDS)
         writer.writeheader()
         for paper in papers:
             writer.writerow(paper)
 
 
-if __name__ == "__main__":
-    # 爬取所有会议所有年份的论文
-    for conference in conferences:
-        for year in conferences[conference]:
-            papers = fetch_conference_papers(conference, year)
-            if papers:
-                # 为该会议年份生成CSV文件
-                filename = f'{conference}_{year}_papers.csv'
-                save_papers_to_csv(papers, filename)
-                print(f"已保存 {conference.upper()} {year} 年论文到 {filename}，共 {len(papers)} 篇")
+class CsvPaperSink:
+    """把论文逐条写入 {会议}_{年份}_papers.csv，第一篇论文到达时才创建文件
+
+    先写入同名的.tmp文件，finish时才替换原有CSV；abort或close丢弃未完成的文件。
+    """
+
+    def __init__(self, output_dir='.'):
+        self.output_dir = output_dir
+        self.files = {}
+
+    def filename(self, venue, year):
+        return os.path.join(self.output_dir, f'{venue}_{year}_papers.csv')
+
+    def write(self, venue, year, paper):
+        if (venue, year) not in self.files:
+            csvfile = open(self.filename(venue, year) + '.tmp', 'w', newline='', encoding='utf-8')
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            self.files[(venue, year)] = (csvfile, writer)
+        self.files[(venue, year)][1].writerow(paper)
+
+    def finish(self, venue, year):
+        if (venue, year) in self.files:
+            self.files.pop((venue, year))[0].close()
+            filename = self.filename(venue, year)
+            os.replace(filename + '.tmp', filename)
+            return filename
+        return None
+
+    def abort(self, venue, year):
+        if (venue, year) in self.files:
+            self.files.pop((venue, year))[0].close()
+            os.remove(self.filename(venue, year) + '.tmp')
+
+    def close(self):
+        for venue, year in list(self.files):
+            self.abort(venue, year)
+
+
+async def harvest(targets, sink, max_concurrency=4, rate=1.0, queue_size=32, chunk_size=256 * 1024):
+    """并发抓取多个(会议, 年份)论文集页面，解析出的论文分批流式写入sink
+
+    页面请求在线程池中执行，最多max_concurrency个页面同时抓取和解析，并受全局限速约束；
+    每解析完一块页面得到的论文作为一批，经有界队列（最多queue_size批）交给唯一的写入协程，
+    写入跟不上时解析协程会在put处等待（背压）。sink的写入在专用的单线程中按顺序执行，不阻塞事件循环；
+    某个页面抓取或解析失败时丢弃它已写入的部分，原有数据保持不变。
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    rate_limiter = RateLimiter(rate)
+    queue = asyncio.Queue(maxsize=queue_size)
+    writer = ThreadPoolExecutor(max_workers=1)
+
+    async def produce(venue, year):
+        url = dblp_url(venue, year)
+        if url is None:
+            print(f"Conference {venue} or year {year} not supported.")
+            await queue.put(('done', venue, year, None))
+            return
+        status = 'failed'
+        try:
+            # 解析也在信号量内进行，同时驻留内存的页面不超过max_concurrency个
+            async with semaphore:
+                response = await loop.run_in_executor(None, fetch_proceedings_page, url, year, rate_limiter)
+                response.raise_for_status()
+
+                # 分块喂给流式解析器，每解析完一批条目就送入写入队列
+                text = response.text
+                extractor = DblpEntryExtractor()
+                for start in range(0, len(text), chunk_size):
+                    extractor.feed(text[start:start + chunk_size])
+                    await drain(extractor, url, venue, year)
+                extractor.close()
+                await drain(extractor, url, venue, year)
+            status = 'done'
+        except requests.exceptions.RequestException as e:
+            print(f"Error fetching papers for {venue} {year}: {e}")
+        except Exception as e:
+            print(f"Unexpected error: {e}")
+        await queue.put((status, venue, year, None))
+
+    async def drain(extractor, url, venue, year):
+        entries, extractor.entries = extractor.entries, []
+        conference_title = extractor.conference_title or venue.upper()
+        if entries:
+            await queue.put(('papers', venue, year, [make_paper(entry, url, conference_title, year)
+                                                      for entry in entries]))
+
+    def write_batch(venue, year, papers):
+        for paper in papers:
+            sink.write(venue, year, paper)
+
+    async def consume(total):
+        counts = {}
+        finished = 0
+        while finished < total:
+            kind, venue, year, papers = await queue.get()
+            if kind == 'papers':
+                await loop.run_in_executor(writer, write_batch, venue, year, papers)
+                counts[(venue, year)] = counts.get((venue, year), 0) + len(papers)
+                continue
+            finished += 1
+            if kind == 'failed':
+                await loop.run_in_executor(writer, sink.abort, venue, year)
+                counts.pop((venue, year), None)
+                print(f"{venue.upper()} {year} 年抓取失败，保留原有数据")
+                continue
+            filename = await loop.run_in_executor(writer, sink.finish, venue, year)
+            if filename:
+                print(f"已保存 {venue.upper()} {year} 年论文到 {filename}，共 {counts[(venue, year)]} 篇")
             else:
-                print(f"{conference.upper()} {year} 年未获取到论文数据")
\ No newline at end of file
+                print(f"{venue.upper()} {year} 年未获取到论文数据")
+        return counts
+
+    targets = list(targets)
+    consumer = asyncio.create_task(consume(len(targets)))
+    producers = [asyncio.create_task(produce(venue, year)) for venue, year in targets]
+    try:
+        # 写入协程收到全部'done'后才返回，此时解析协程都已结束；sink.write出错时异常从这里抛出
+        return await consumer
+    finally:
+        # 写入失败（或harvest被取消）时取消其余任务，解析协程不会永久阻塞在已满队列的put上
+        consumer.cancel()
+        for task in producers:
+            task.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+        # 等写入线程中正在执行的操作结束后再关闭sink
+        writer.shutdown()
+        sink.close()
+
+
+if __name__ == "__main__" and '--benchmark' in sys.argv:
+    # 用一个论文集页面比较各解析后端的耗时
+    url = conferences['nips'][2024]
+    page = fetch_proceedings_page(url, 2024)
+    benchmark_parsers(page.content, url)
+
+elif __name__ == "__main__" and '--import-csv' in sys.argv:
+    # 把已爬取的CSV文件导入Parquet数据集
+    import_csv_dir(os.path.dirname(os.path.abspath(__file__)), PAPER_DATASET)
+
+elif __name__ == "__main__":
+    # 爬取所有会议所有年份的论文，默认写入Parquet数据集，--csv时写出各会议年份的CSV文件
+    targets = [(venue, year) for venue in conferences for year in conferences[venue]]
+    sink = CsvPaperSink() if '--csv' in sys.argv else ParquetPaperSink(PAPER_DATASET)
+    asyncio.run(harvest(targets, sink))
\ No newline at end of file
@@ -0,0 +1,222 @@
+import heapq
+import re
+from collections import Counter
+
+import pandas as pd
+
+# 停用词
+english_stopwords = {
+    "the", "and", "of", "in", "to", "a", "an", "for", "on", "with", "by", "at",
+    "from", "is", "are", "as", "be", "this", "that", "it", "we", "our", "you",
+    "your", "their", "its", "they", "or", "not", "but", "if", "then", "else",
+    "when", "where", "how", "what", "which", "why", "who", "whom", "whose",
+}
+
+word_pattern = re.compile(r'\b\w+\b')
+
+
+def is_keyword(word):
+    return word not in english_stopwords and len(word) > 2 and not word.isdigit()
+
+
+# 创建一个函数来提取关键词
+def extract_keywords(text):
+    # 转换为小写
+    text = text.lower()
+
+    # 使用正则表达式分词
+    words = word_pattern.findall(text)
+
+    # 过滤停用词、短词和纯数字
+    keywords = [word for word in words if is_keyword(word)]
+
+    return keywords
+
+
+def count_keywords_chunk(titles):
+    """统计一批标题的关键词频率（进程池中的工作函数）"""
+    counts = Counter()
+    for title in titles:
+        if isinstance(title, str):
+            counts.update(extract_keywords(title))
+    return counts
+
+
+def count_keywords(titles, executor=None, chunk_size=20000):
+    """统计全部标题的关键词频率，结果与逐条提取后Counter(all_keywords)相同
+
+    传入executor（由调用方创建、在多次调用之间复用的进程池）且标题较多时，按chunk_size分块交给它处理，
+    部分词频按分块顺序合并，因此关键词的首次出现顺序也与串行处理一致；否则在当前进程中串行统计。
+    """
+    titles = list(titles)
+    if executor is None or len(titles) <= chunk_size:
+        return count_keywords_chunk(titles)
+
+    chunks = [titles[i:i + chunk_size] for i in range(0, len(titles), chunk_size)]
+    total = Counter()
+    for counts in executor.map(count_keywords_chunk, chunks):
+        total.update(counts)
+    return total
+
+
+def extract_phrases(text, n_values=(2, 3)):
+    """提取二元/三元短语，例如 "graph neural network"
+
+    短语只由相邻的关键词组成，遇到停用词、短词或数字就断开，
+    避免 "learning with noisy labels" 产生 "learning noisy" 这种跨词组合。
+    """
+    phrases = []
+    run = []
+    for word in word_pattern.findall(text.lower()) + ['']:
+        if word and is_keyword(word):
+            run.append(word)
+            continue
+        for n in n_values:
+            for i in range(len(run) - n + 1):
+                phrases.append(' '.join(run[i:i + n]))
+        run = []
+    return phrases
+
+
+def count_phrases_chunk(titles, n_values=(2, 3)):
+    """统计一批标题的短语频率（进程池中的工作函数）"""
+    counts = Counter()
+    for title in titles:
+        if isinstance(title, str):
+            counts.update(extract_phrases(title, n_values))
+    return counts
+
+
+class SpaceSaving:
+    """Space-Saving 高频项统计：最多保留capacity个短语，内存不随词表增长
+
+    计数可能偏大，但偏差不超过errors中记录的值；真实频率超过 总数/capacity 的短语一定会被保留。
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.heap = []  # (计数, 短语) 的小顶堆，允许存在过期条目
+        self.total = 0
+
+    def add(self, item, weight=1):
+        self.total += weight
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+        else:
+            # 替换当前计数最小的短语，新短语继承其计数作为误差上界
+            min_count, min_item = self._pop_min()
+            del self.counts[min_item]
+            del self.errors[min_item]
+            self.counts[item] = min_count + weight
+            self.errors[item] = min_count
+        heapq.heappush(self.heap, (self.counts[item], item))
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [(count, key) for key, count in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self.heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def update(self, counts):
+        for item, weight in counts.items():
+            self.add(item, weight)
+
+    def get(self, item, default=0):
+        return self.counts.get(item, default)
+
+    def guaranteed(self, item):
+        """扣除误差后的计数下界"""
+        return self.counts.get(item, 0) - self.errors.get(item, 0)
+
+    def unmonitored_bound(self):
+        """未被保留的短语的计数上界：容量未满时没有被淘汰过的短语，上界为0，否则为当前最小计数"""
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def most_common(self, n=None):
+        items = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return items if n is None else items[:n]
+
+
+def count_phrases(titles, capacity=50000, n_values=(2, 3), executor=None, chunk_size=20000):
+    """用Space-Saving统计全部标题的短语频率，各分块的部分计数依次并入
+
+    传入executor（与count_keywords共用的进程池）时分块在其中并行统计，否则串行统计。
+    """
+    titles = list(titles)
+    summary = SpaceSaving(capacity)
+    chunks = [titles[i:i + chunk_size] for i in range(0, len(titles), chunk_size)]
+    if executor is None or len(chunks) <= 1:
+        for chunk in chunks:
+            summary.update(count_phrases_chunk(chunk, n_values))
+        return summary
+
+    for counts in executor.map(count_phrases_chunk, chunks, [n_values] * len(chunks)):
+        summary.update(counts)
+    return summary
+
+
+def emerging_phrases(yearly_summaries, years, top_n=20, min_count=5):
+    """按年份给出新兴短语排名：与上一年相比增长倍数最高的短语
+
+    增长倍数 = (当年计数 + 1) / (上一年计数 + 1)，当年计数使用扣除误差后的下界，上一年计数使用上界：
+    上一年摘要中已被淘汰的短语按其计数上界（上一年摘要的最小计数）计算，而不是当作0，
+    因此增长倍数只会偏低、不会被淘汰夸大。只考虑当年计数不少于min_count的短语。
+    """
+    years = list(years)
+    rows = []
+    for prev_year, year in zip(years, years[1:]):
+        current = yearly_summaries[year]
+        previous = yearly_summaries[prev_year]
+        unmonitored = previous.unmonitored_bound()
+        candidates = []
+        for phrase in current.counts:
+            count = current.guaranteed(phrase)
+            if count < min_count:
+                continue
+            prev_count = previous.get(phrase, unmonitored)
+            candidates.append((phrase, count, prev_count, (count + 1) / (prev_count + 1)))
+        for rank, (phrase, count, prev_count, growth) in enumerate(
+                heapq.nlargest(top_n, candidates, key=lambda item: (item[3], item[1])), 1):
+            rows.append({'年份': year, '排名': rank, '短语': phrase,
+                         '出现次数': count, '上一年次数': prev_count, '增长倍数': round(growth, 2)})
+    return pd.DataFrame(rows, columns=['年份', '排名', '短语', '出现次数', '上一年次数', '增长倍数'])
+
+
+def total_frequencies(yearly_frequencies, years):
+    """合并各年份的词频"""
+    total = Counter()
+    for year in years:
+        total.update(yearly_frequencies[year])
+    return total
+
+
+def top_k_terms(yearly_frequencies, years, k):
+    """返回总频率最高的k个关键词（按频率降序），只保留k个候选而不对整个词表排序"""
+    total = total_frequencies(yearly_frequencies, years)
+    return [term for term, _ in heapq.nlargest(k, total.items(), key=lambda item: item[1])]
+
+
+def build_trend_matrix(yearly_frequencies, years, terms=None):
+    """一次性构建 关键词 × 年份 的整数词频矩阵
+
+    terms为None时包含全部关键词，否则只包含指定关键词（行顺序与terms一致）。
+    """
+    columns = {}
+    for year in years:
+        freq = yearly_frequencies[year]
+        if terms is not None:
+            freq = {term: freq.get(term, 0) for term in terms}
+        columns[year] = pd.Series(freq, dtype='int64')
+
+    trend_df = pd.DataFrame(columns)
+    if terms is not None:
+        trend_df = trend_df.reindex(terms)
+    return trend_df.fillna(0).astype('int64')
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from wordcloud import WordCloud
+
+# 词云渲染参数，任何一项变化都会使缓存失效
+WORDCLOUD_PARAMS = {
+    'width': 1200,
+    'height': 800,
+    'background_color': 'white',
+    'max_words': 200,
+    'collocations': False,
+    'font_path': 'simhei.ttf',  # 支持中文的字体
+    'figsize': (15, 10),
+    'dpi': 150,
+}
+
+MANIFEST_NAME = 'wordcloud_cache.json'
+
+
+def render_hash(frequencies, title, params):
+    """由词频表、标题和渲染参数计算缓存键"""
+    payload = json.dumps([sorted(frequencies.items()), title, sorted(params.items())],
+                         ensure_ascii=False, default=list)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_wordcloud(frequencies, title, output_path, params):
+    """渲染单张词云并保存（进程池中的工作函数）"""
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    wordcloud = WordCloud(
+        width=params['width'],
+        height=params['height'],
+        background_color=params['background_color'],
+        max_words=params['max_words'],
+        collocations=params['collocations'],
+        font_path=params['font_path']
+    ).generate_from_frequencies(frequencies)
+
+    plt.figure(figsize=params['figsize'])
+    plt.imshow(wordcloud, interpolation="bilinear")
+    plt.axis("off")
+    plt.title(title, fontsize=20)
+    plt.savefig(output_path, bbox_inches="tight", dpi=params['dpi'])
+    plt.close()
+    return output_path
+
+
+def save_manifest(manifest_path, manifest):
+    """先写临时文件再改名，中途中断不会留下半个缓存清单"""
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def render_wordclouds(jobs, output_dir, params=WORDCLOUD_PARAMS, workers=None):
+    """批量渲染词云，跳过词频和参数都没有变化的图片
+
+    jobs为 [(文件名, 词频, 标题), ...]；需要重绘的图片在多个进程中并行渲染，
+    每张图片渲染完成后立即把缓存键记入输出目录的wordcloud_cache.json。
+    某张图片渲染失败时其余图片照常完成并记录，最后再抛出第一个异常。
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    pending = []
+    for filename, frequencies, title in jobs:
+        output_path = os.path.join(output_dir, filename)
+        key = render_hash(frequencies, title, params)
+        if manifest.get(filename) == key and os.path.exists(output_path):
+            print(f"词云未变化，跳过: {output_path}")
+            continue
+        pending.append((filename, dict(frequencies), title, output_path, key))
+
+    errors = []
+
+    def finished(job, render):
+        filename, _, _, output_path, key = job
+        try:
+            render()
+        except Exception as e:
+            print(f"词云渲染失败: {output_path}: {e}")
+            errors.append(e)
+            return
+        manifest[filename] = key
+        save_manifest(manifest_path, manifest)
+        print(f"词云已保存: {output_path}")
+
+    if pending:
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        if workers <= 1:
+            for job in pending:
+                _, frequencies, title, output_path, _ = job
+                finished(job, lambda: render_wordcloud(frequencies, title, output_path, params))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for job in pending:
+                    _, frequencies, title, output_path, _ = job
+                    futures[executor.submit(render_wordcloud, frequencies, title, output_path, params)] = job
+                for future in as_completed(futures):
+                    finished(futures[future], future.result)
+        if errors:
+            raise errors[0]
+
+    return [output_path for _, _, _, output_path, _ in pending]
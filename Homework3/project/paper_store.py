@@ -0,0 +1,137 @@
+import os
+import re
+import shutil
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+# 论文数据集按 venue=<会议>/year=<年份> 分区存储，conference_name 使用字典编码
+PAPER_SCHEMA = None if pa is None else pa.schema([
+    ('title', pa.string()),
+    ('authors', pa.string()),
+    ('conference_name', pa.dictionary(pa.int32(), pa.string())),
+    ('link', pa.string()),
+])
+
+PARTITIONING = None if pa is None else ds.partitioning(
+    pa.schema([('venue', pa.string()), ('year', pa.int32())]), flavor='hive')
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("论文Parquet数据集需要安装pyarrow: pip install pyarrow")
+
+
+def partition_dir(dataset_dir, venue, year):
+    return os.path.join(dataset_dir, f'venue={venue}', f'year={year}')
+
+
+def staging_dir(dataset_dir, venue, year):
+    """分区写入过程中使用的临时目录；以'.'开头，读取数据集时会被pyarrow忽略"""
+    return os.path.join(dataset_dir, f'venue={venue}', f'.year={year}.tmp')
+
+
+def replace_dir(src, dst):
+    """用src目录替换dst目录：旧目录先改名移开，src改名到位后再删除旧目录"""
+    old = os.path.join(os.path.dirname(dst), '.' + os.path.basename(dst) + '.old')
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(dst):
+        os.replace(dst, old)
+    os.replace(src, dst)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+class ParquetPaperSink:
+    """把论文逐批追加写入按会议和年份分区的Parquet数据集
+
+    接口与CsvPaperSink相同；某个(会议, 年份)的论文先写入临时目录，每攒够batch_size篇写出一个row group，
+    finish时才替换原有分区。abort或close丢弃未完成的分区，抓取中途失败时原有数据保持不变。
+    """
+
+    def __init__(self, dataset_dir, batch_size=5000):
+        require_pyarrow()
+        self.dataset_dir = dataset_dir
+        self.batch_size = batch_size
+        self.writers = {}
+        self.buffers = {}
+
+    def write(self, venue, year, paper):
+        key = (venue, year)
+        if key not in self.writers:
+            path = staging_dir(self.dataset_dir, venue, year)
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+            self.writers[key] = pq.ParquetWriter(os.path.join(path, 'part-0.parquet'), PAPER_SCHEMA)
+            self.buffers[key] = []
+        self.buffers[key].append(paper)
+        if len(self.buffers[key]) >= self.batch_size:
+            self._flush(key)
+
+    def _flush(self, key):
+        rows = self.buffers[key]
+        if rows:
+            table = pa.Table.from_pydict(
+                {name: [row[name] for row in rows] for name in PAPER_SCHEMA.names}, schema=PAPER_SCHEMA)
+            self.writers[key].write_table(table)
+            self.buffers[key] = []
+
+    def finish(self, venue, year):
+        key = (venue, year)
+        if key not in self.writers:
+            return None
+        self._flush(key)
+        self.writers.pop(key).close()
+        self.buffers.pop(key)
+        path = partition_dir(self.dataset_dir, venue, year)
+        replace_dir(staging_dir(self.dataset_dir, venue, year), path)
+        return path
+
+    def abort(self, venue, year):
+        """丢弃尚未finish的分区"""
+        key = (venue, year)
+        if key not in self.writers:
+            return
+        self.buffers.pop(key)
+        self.writers.pop(key).close()
+        shutil.rmtree(staging_dir(self.dataset_dir, venue, year), ignore_errors=True)
+
+    def close(self):
+        for key in list(self.writers):
+            self.abort(*key)
+
+
+def import_csv_dir(csv_dir, dataset_dir):
+    """把已有的 {会议}_{年份}_papers.csv 文件导入Parquet数据集，无需重新爬取"""
+    import pandas as pd
+
+    sink = ParquetPaperSink(dataset_dir)
+    for filename in sorted(os.listdir(csv_dir)):
+        match = re.fullmatch(r'(\w+?)_(\d{4})_papers\.csv', filename)
+        if not match:
+            continue
+        venue, year = match.group(1), int(match.group(2))
+        df = pd.read_csv(os.path.join(csv_dir, filename), dtype=str, keep_default_na=False)
+        for paper in df.to_dict('records'):
+            sink.write(venue, year, paper)
+        print(f"已导入 {filename}，共 {len(df)} 篇")
+        sink.finish(venue, year)
+
+
+def load_papers(dataset_dir, columns=None, venues=None, years=None):
+    """读取论文数据集，只扫描需要的列和分区
+
+    columns可以包含分区列venue和year，例如 load_papers(path, columns=['title', 'year'])。
+    """
+    require_pyarrow()
+    dataset = ds.dataset(dataset_dir, format='parquet', partitioning=PARTITIONING)
+    condition = None
+    if venues is not None:
+        condition = ds.field('venue').isin(list(venues))
+    if years is not None:
+        year_filter = ds.field('year').isin([int(year) for year in years])
+        condition = year_filter if condition is None else condition & year_filter
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
@@ -1,135 +1,246 @@
-import requests
+import os
+import sys
 import json
+import numpy as np
 import pandas as pd
-from datetime import datetime
 import time
-import random
 
-
-def fetch_dlt_data():
-    base_url = "https://jc.zhcw.com/port/client_json.php"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Referer': 'https://www.zhcw.com/kjxx/dlt/',
-        'Accept': 'application/json, text/javascript, */*; q=0.01',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        'Connection': 'keep-alive'
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawl_utils import RateLimiter, create_session, default_cache, fetch_concurrently, loads_jsonp, with_backoff
+from dlt_amounts import normalize_amounts
+from dlt_store import DEFAULT_LABEL, HISTORY_LABEL, export_csv, export_excel, export_name, import_csv, save_store
+from dlt_tiers import BET_FIELDS, BONUS_LEVELS, TierTableBuilder, pivot_wide
+
+
+BASE_URL = "https://jc.zhcw.com/port/client_json.php"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://www.zhcw.com/kjxx/dlt/',
+    'Accept': 'application/json, text/javascript, */*; q=0.01',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Connection': 'keep-alive'
+}
+
+# 全量回填：issueCount取一个大于历史总期数的值，每页检查点保存在脚本目录下
+FULL_HISTORY_ISSUES = 10000
+BACKFILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dlt_backfill_pages')
+
+
+def parse_dlt_item(item):
+    """把接口返回的一期开奖数据转换为一行记录"""
+
+    # 创建详情页URL
+    issue_number = item.get('issue', '')
+    detail_url = f"https://www.zhcw.com/kjxx/dlt/kjxq/?kjData={issue_number}" if issue_number else ""
+
+    # 创建数据记录
+    record = {
+        '期号': issue_number,
+        '详情页链接': detail_url,
+        '开奖日期': item.get('openTime'),
+        '星期': item.get('week'),
+        '中奖号码_前区': item.get('frontWinningNum', ''),
+        '中奖号码_后区': item.get('backWinningNum', ''),
+        '出球顺序_前区': item.get('seqFrontWinningNum', ''),
+        '出球顺序_后区': item.get('seqBackWinningNum', ''),
+        # 金额保留接口原始字符串，汇总成表后整列一次性转换
+        '总销售额(元)': item.get('saleMoney', '0'),
+        '奖池奖金(元)': item.get('prizePoolMoney', '0'),
+        # 中奖详情只保留出现的奖级，写入时再汇总成奖级长表
+        '奖级明细': parse_winner_details(item.get('winnerDetails', [])),
+    }
+    return record
+
+
+def request_dlt_page(session, page, issue_count=100, page_size=30, rate_limiter=None):
+    """请求一页开奖数据并解析JSONP，返回接口的JSON对象"""
+    # 生成时间戳参数
+    timestamp = int(time.time() * 1000)
+    params = {
+        'transactionType': '10001001',
+        'lotteryId': '281',
+        'issueCount': str(issue_count),
+        'pageNum': str(page),
+        'pageSize': str(page_size),
+        'type': '0',
+        'tt': f'0.{timestamp}',
+        '_': str(timestamp)
     }
 
+    # 最新开奖数据缓存1小时；tt和_只是防缓存的时间戳，不参与缓存键
+    # 网络异常、限流和5xx按指数退避重试，代替固定的随机等待
+    response = with_backoff(
+        default_cache.get,
+        BASE_URL,
+        session=session,
+        params=params,
+        timeout=20,
+        ttl=3600,
+        ignore_params=('tt', '_'),
+        rate_limiter=rate_limiter
+    )
+
+    if response.status_code != 200:
+        raise ValueError(f"请求失败，状态码：{response.status_code}，响应内容: {response.text[:200]}")
+
+    # 处理JSONP响应：直接在字节上定位JSON边界并解析
+    data = loads_jsonp(response.content)
+
+    # 确保data字段存在
+    if 'data' not in data or not isinstance(data['data'], list):
+        raise ValueError(f"第{page}页返回数据格式异常，响应内容: {response.text[:500]}")
+    return data
+
+
+def fetch_dlt_page(session, page, total_pages, issue_count=100, page_size=30, rate_limiter=None):
+    """获取并解析一页开奖数据，失败时返回None"""
+    try:
+        print(f"正在获取第 {page}/{total_pages} 页数据...")
+        data = request_dlt_page(session, page, issue_count, page_size, rate_limiter)
+        records = [parse_dlt_item(item) for item in data['data']]
+        print(f"  第{page}页成功解析 {len(records)} 期数据")
+        return records
+    except Exception as e:
+        print(f"  请求异常：{str(e)}")
+        return None
+
+
+def fetch_dlt_data(total_pages=4, max_workers=4, rate=2.0):
+    """并发获取各页开奖数据，结果按页码顺序拼接
+
+    所有页面共用一个keep-alive会话，请求速率由令牌桶限制（平均每秒rate个）。
+    """
+    session = create_session(pool_size=max_workers, headers=HEADERS)
+    rate_limiter = RateLimiter(rate, burst=2)
+    tasks = [(session, page, total_pages, 100, 30, rate_limiter) for page in range(1, total_pages + 1)]
+    pages = fetch_concurrently(fetch_dlt_page, tasks, max_workers=max_workers)
+
     all_data = []
-    total_pages = 4
-
-    # 分页获取数据
-    for page in range(1, total_pages + 1):
-        # 生成时间戳参数
-        timestamp = int(time.time() * 1000)
-        params = {
-            'transactionType': '10001001',
-            'lotteryId': '281',
-            'issueCount': '100',
-            'pageNum': str(page),
-            'pageSize': '30',
-            'type': '0',
-            'tt': f'0.{timestamp}',
-            '_': str(timestamp)
-        }
+    for records in pages:
+        all_data.extend(records or [])
+    return all_data
 
-        try:
-            print(f"正在获取第 {page}/{total_pages} 页数据...")
-            response = requests.get(
-                url=base_url,
-                params=params,
-                headers=headers,
-                timeout=20
-            )
-
-            if response.status_code == 200:
-                # 处理JSONP响应
-                json_str = response.text
-                if json_str.startswith('jQuery') and '(' in json_str:
-                    json_str = json_str.split('(', 1)[1].rsplit(')', 1)[0]
-
-                try:
-                    data = json.loads(json_str)
-                except json.JSONDecodeError:
-                    print("  响应不是有效JSON，尝试直接解析...")
-                    json_str = response.text.strip().strip(';').strip()
-                    if json_str.startswith('jQuery') and '(' in json_str:
-                        json_str = json_str.split('(', 1)[1].rsplit(')', 1)[0]
-                    data = json.loads(json_str)
-
-                # 确保data字段存在
-                if 'data' in data and isinstance(data['data'], list):
-                    page_data_count = 0
-                    for item in data['data']:
-                        # 解析中奖详情
-                        prize_details = parse_winner_details(item.get('winnerDetails', []))
-
-                        # 创建详情页URL
-                        issue_number = item.get('issue', '')
-                        detail_url = f"https://www.zhcw.com/kjxx/dlt/kjxq/?kjData={issue_number}" if issue_number else ""
-
-                        # 创建数据记录
-                        record = {
-                            '期号': issue_number,
-                            '详情页链接': detail_url,
-                            '开奖日期': item.get('openTime'),
-                            '星期': item.get('week'),
-                            '中奖号码_前区': item.get('frontWinningNum', ''),
-                            '中奖号码_后区': item.get('backWinningNum', ''),
-                            '出球顺序_前区': item.get('seqFrontWinningNum', ''),
-                            '出球顺序_后区': item.get('seqBackWinningNum', ''),
-                            '总销售额(元)': format_amount(item.get('saleMoney', '0')),
-                            '奖池奖金(元)': format_amount(item.get('prizePoolMoney', '0')),
-                        }
-
-                        # 添加中奖详情
-                        record.update(prize_details)
-                        all_data.append(record)
-                        page_data_count += 1
-
-                    print(f"  成功解析 {page_data_count} 期数据")
-                else:
-                    print(f"  第{page}页返回数据格式异常")
-                    print(f"  响应内容: {response.text[:500]}")
-            else:
-                print(f"  请求失败，状态码：{response.status_code}")
-                print(f"  响应内容: {response.text[:200]}")
 
-        except Exception as e:
-            print(f"  请求异常：{str(e)}")
+def page_positions(total, page, page_size):
+    """总期数为total时第page页覆盖的期序范围 (起, 止)，期序从最早一期的1开始计
+
+    接口按期号倒序分页，有新开奖时页码对应的期号会后移，但期序不变，
+    因此检查点按期序范围保存。
+    """
+    last = total - (page - 1) * page_size
+    return max(1, last - page_size + 1), last
+
+
+def checkpoint_path(checkpoint_dir, first, last):
+    return os.path.join(checkpoint_dir, f'issues_{first:05d}_{last:05d}.json')
+
+
+def saved_ranges(checkpoint_dir):
+    """已保存检查点覆盖的期序范围列表"""
+    ranges = []
+    for name in os.listdir(checkpoint_dir):
+        stem, ext = os.path.splitext(name)
+        parts = stem.split('_')
+        if ext == '.json' and len(parts) == 3 and parts[0] == 'issues':
+            ranges.append((int(parts[1]), int(parts[2])))
+    return sorted(ranges)
+
+
+def save_checkpoint(checkpoint_dir, first, last, records):
+    """先写临时文件再改名，中途中断不会留下半个检查点"""
+    path = checkpoint_path(checkpoint_dir, first, last)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(records, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
 
-        # 添加随机请求间隔，避免被封IP
-        time.sleep(random.uniform(1.0, 2.5))
+def load_checkpoint(checkpoint_dir, first, last):
+    try:
+        with open(checkpoint_path(checkpoint_dir, first, last), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
+
+def page_total(data, page_size):
+    """接口返回的总期数；没有total字段时按总页数估算"""
+    total = data.get('total')
+    if total:
+        return int(total)
+    return int(data.get('pages') or 1) * page_size
+
+
+def backfill_dlt_history(checkpoint_dir=BACKFILL_DIR, page_size=100, max_workers=4, rate=2.0):
+    """抓取大乐透全部历史开奖数据，每完成一页就写入检查点
+
+    检查点以期序范围（从最早一期起计数）命名，每页按其返回时的总期数换算期序，
+    新开奖只会增加新的期序，不会让已保存的范围失效。每次运行先用第1页得到当前总期数，
+    再只获取覆盖缺失期序的页，中断或期间有新开奖后重新运行都能补齐，不会遗漏。
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    session = create_session(pool_size=max_workers, headers=HEADERS)
+    rate_limiter = RateLimiter(rate, burst=2)
+
+    def fetch_and_checkpoint(page):
+        try:
+            print(f"正在获取第 {page} 页数据...")
+            data = request_dlt_page(session, page, FULL_HISTORY_ISSUES, page_size, rate_limiter)
+        except Exception as e:
+            print(f"  请求异常：{str(e)}")
+            return None
+        records = [parse_dlt_item(item) for item in data['data']]
+        first, last = page_positions(page_total(data, page_size), page, page_size)
+        # 条数与期序范围对不上时（分页期间总期数变化等）不保存，留给下一轮补齐
+        if len(records) != last - first + 1:
+            print(f"  第{page}页返回 {len(records)} 期，与期序 {first}-{last} 不符，稍后重试")
+            return None
+        save_checkpoint(checkpoint_dir, first, last, records)
+        print(f"  第{page}页成功解析 {len(records)} 期数据（期序 {first}-{last}）")
+        return data
+
+    # 第1页总是重新获取（缓存1小时），同时得到当前总期数
+    first_page = fetch_and_checkpoint(1)
+    if first_page is None:
+        raise RuntimeError("第1页获取失败，无法确定总期数")
+    total = page_total(first_page, page_size)
+
+    covered = np.zeros(total + 1, dtype=bool)
+    covered[0] = True
+    for first, last in saved_ranges(checkpoint_dir):
+        covered[first:min(last, total) + 1] = True
+    total_pages = -(-total // page_size)
+    missing = []
+    for page in range(2, total_pages + 1):
+        first, last = page_positions(total, page, page_size)
+        if not covered[first:last + 1].all():
+            missing.append(page)
+    print(f"全量历史共 {total} 期 {total_pages} 页，待获取 {len(missing)} 页")
+
+    done = fetch_concurrently(fetch_and_checkpoint, [(page,) for page in missing], max_workers=max_workers)
+    failed = [page for page, data in zip(missing, done) if data is None]
+    if failed:
+        print(f"以下页获取失败，重新运行即可续传: {failed}")
+
+    # 从最新的期序范围开始合并检查点，按期号去重
+    all_data = []
+    seen = set()
+    for first, last in sorted(saved_ranges(checkpoint_dir), reverse=True):
+        for record in load_checkpoint(checkpoint_dir, first, last) or []:
+            if record['期号'] not in seen:
+                seen.add(record['期号'])
+                all_data.append(record)
     return all_data
 
 
 def parse_winner_details(winner_details):
-    """解析中奖详情数据结构，只为1-2等奖添加派奖和追加派奖字段"""
-    prize_data = {}
-
-    # 初始化所有奖项的基本和追加投注字段
-    for level in range(1, 10):
-        # 基本投注
-        prize_data[f'{level}等奖_基本注数'] = 0
-        prize_data[f'{level}等奖_基本单注奖金(元)'] = 0
-        prize_data[f'{level}等奖_基本总奖金(元)'] = 0
-
-        # 追加投注
-        prize_data[f'{level}等奖_追加注数'] = 0
-        prize_data[f'{level}等奖_追加单注奖金(元)'] = 0
-        prize_data[f'{level}等奖_追加总奖金(元)'] = 0
-
-    # 只为1-2等奖添加派奖和追加派奖字段
-    for level in range(1, 3):
-        prize_data[f'{level}等奖_派奖注数'] = 0
-        prize_data[f'{level}等奖_派奖单注金额(元)'] = 0
-        prize_data[f'{level}等奖_派奖总金额(元)'] = 0
-
-        prize_data[f'{level}等奖_追加派奖注数'] = 0
-        prize_data[f'{level}等奖_追加派奖单注金额(元)'] = 0
-        prize_data[f'{level}等奖_追加派奖总金额(元)'] = 0
+    """解析中奖详情，返回(奖级, 投注类型编号, 注数, 单注奖金, 总奖金)元组列表
+
+    投注类型编号见dlt_tiers.BET_TYPES，派奖和追加派奖只取1-2等奖；
+    金额保持原始值，由TierTableBuilder.to_frame统一转换。
+    """
+    tiers = []
 
     # 解析每个奖项
     for detail in winner_details:
@@ -138,138 +249,75 @@ def parse_winner_details(winner_details):
             if not (1 <= level <= 9):
                 continue
 
-            # 处理基本投注
-            base = detail.get('baseBetWinner', {})
-            if base and isinstance(base, dict):
-                prize_data[f'{level}等奖_基本注数'] = base.get('awardNum', 0)
-                prize_data[f'{level}等奖_基本单注奖金(元)'] = format_amount(base.get('awardMoney', 0))
-                prize_data[f'{level}等奖_基本总奖金(元)'] = format_amount(base.get('totalMoney', 0))
-
-            # 处理追加投注
-            add = detail.get('addToBetWinner', {})
-            if add and isinstance(add, dict):
-                prize_data[f'{level}等奖_追加注数'] = add.get('awardNum', 0)
-                prize_data[f'{level}等奖_追加单注奖金(元)'] = format_amount(add.get('awardMoney', 0))
-                prize_data[f'{level}等奖_追加总奖金(元)'] = format_amount(add.get('totalMoney', 0))
-
-            # 只处理1-2等奖的派奖信息
-            if level in (1, 2):
-                # 处理派奖
-                add2 = detail.get('addToBetWinner2', {})
-                if add2 and isinstance(add2, dict):
-                    prize_data[f'{level}等奖_派奖注数'] = add2.get('awardNum', 0)
-                    prize_data[f'{level}等奖_派奖单注金额(元)'] = format_amount(add2.get('awardMoney', 0))
-                    prize_data[f'{level}等奖_派奖总金额(元)'] = format_amount(add2.get('totalMoney', 0))
-
-                # 处理追加派奖
-                add3 = detail.get('addToBetWinner3', {})
-                if add3 and isinstance(add3, dict):
-                    prize_data[f'{level}等奖_追加派奖注数'] = add3.get('awardNum', 0)
-                    prize_data[f'{level}等奖_追加派奖单注金额(元)'] = format_amount(add3.get('awardMoney', 0))
-                    prize_data[f'{level}等奖_追加派奖总金额(元)'] = format_amount(add3.get('totalMoney', 0))
+            for field, bet_code in BET_FIELDS.items():
+                if bet_code >= 2 and level not in BONUS_LEVELS:
+                    break
+                bet = detail.get(field, {})
+                if bet and isinstance(bet, dict):
+                    tiers.append((level, bet_code, bet.get('awardNum', 0),
+                                  bet.get('awardMoney', 0), bet.get('totalMoney', 0)))
 
         except Exception as e:
             print(f"解析中奖详情出错：{str(e)}")
             print(f"问题数据: {detail}")
 
-    return prize_data
-
-def format_amount(value):
-    """格式化金额数字，移除逗号并转换为整数"""
-    if isinstance(value, str):
-        # 移除逗号和可能的货币符号
-        value = value.replace(',', '').replace('￥', '').replace('元', '')
-        # 处理小数情况
-        if '.' in value:
-            try:
-                return int(float(value))
-            except:
-                return 0
-        try:
-            return int(value) if value else 0
-        except:
-            return 0
-    elif isinstance(value, (int, float)):
-        return int(value)
-    return 0
+    return tiers
 
 
 # 主程序
-if __name__ == "__main__":
+if __name__ == "__main__" and '--import-csv' in sys.argv:
+    # 把已有的CSV导入Parquet主存储，无需重新爬取
+    import_csv(export_name(DEFAULT_LABEL))
+elif __name__ == "__main__":
     print("=" * 60)
     print("大乐透开奖数据分析工具")
     print("开始处理数据...")
     print("=" * 60)
 
     start_time = time.time()
-    data = fetch_dlt_data()
+    # --backfill：抓取全部历史开奖数据（断点续传），否则只获取近100期
+    backfill = '--backfill' in sys.argv
+    data = backfill_dlt_history() if backfill else fetch_dlt_data()
+    data_label = HISTORY_LABEL if backfill else DEFAULT_LABEL
 
     if data:
+        # 奖级明细汇总成列式长表，宽表只在导出CSV/Excel时透视生成
+        builder = TierTableBuilder()
+        for record in data:
+            builder.add(record['期号'], record.pop('奖级明细'))
+        tiers = builder.to_frame()
+
         df = pd.DataFrame(data)
-        # 定义新的字段顺序
-        new_columns = [
-            '期号', '详情页链接', '开奖日期', '星期', '中奖号码_前区', '中奖号码_后区',
-            '出球顺序_前区', '出球顺序_后区', '总销售额(元)', '奖池奖金(元)'
-        ]
-
-        # 为每个奖项定义字段顺序
-        for level in range(1, 10):
-            # 基本投注字段
-            new_columns.extend([
-                f'{level}等奖_基本注数',
-                f'{level}等奖_基本单注奖金(元)',
-                f'{level}等奖_基本总奖金(元)',
-            ])
-
-            # 追加投注字段
-            new_columns.extend([
-                f'{level}等奖_追加注数',
-                f'{level}等奖_追加单注奖金(元)',
-                f'{level}等奖_追加总奖金(元)',
-            ])
-
-            # 对于1-2等奖，添加派奖字段
-            if level in (1, 2):
-                new_columns.extend([
-                    f'{level}等奖_派奖注数',
-                    f'{level}等奖_派奖单注金额(元)',
-                    f'{level}等奖_派奖总金额(元)',
-
-                    f'{level}等奖_追加派奖注数',
-                    f'{level}等奖_追加派奖单注金额(元)',
-                    f'{level}等奖_追加派奖总金额(元)',
-                ])
-
-        # 确保所有列都存在（可能有些列在数据中不存在）
-        existing_columns = [col for col in new_columns if col in df.columns]
-
-        #添加可能遗漏的列
-        for col in df.columns:
-            if col not in existing_columns:
-                existing_columns.append(col)
-
-        # 重新排序数据框
-        df = df[existing_columns]
+        for column in ('总销售额(元)', '奖池奖金(元)'):
+            df[column], _ = normalize_amounts(df[column])
 
         # 按开奖日期排序
         df['开奖日期'] = pd.to_datetime(df['开奖日期'])
         df = df.sort_values('开奖日期', ascending=False).reset_index(drop=True)
 
-        # 保存文件
-        current_date = datetime.now().strftime("%Y%m%d")
-        csv_filename = "近100期大乐透开奖数据和中奖情况.csv"
-        excel_filename = "近100期大乐透开奖数据和中奖情况.xlsx"
-
-        df.to_csv(csv_filename, index=False, encoding='utf_8_sig')
-        df.to_excel(excel_filename, index=False)
+        # 保存到Parquet主存储，分析脚本都从这里读取；CSV/Excel只在指定--export时流式导出
+        store_dir = save_store(df, tiers, data_label)
+        csv_filename = export_name(data_label)
+        excel_filename = export_name(data_label, '.xlsx')
+        export = '--export' in sys.argv
+        if export:
+            export_csv(csv_filename, data_label)
+            export_excel(excel_filename, data_label)
 
         print("\n" + "=" * 60)
         print(f"数据处理完成！耗时: {time.time() - start_time:.2f}秒")
         print(f"共处理 {len(df)} 期开奖数据")
-        print(f"CSV文件已保存: {csv_filename}")
-        print(f"Excel文件已保存: {excel_filename}")
+        print(f"数据已保存: {store_dir}（奖级明细 {len(tiers)} 行）")
+        if export:
+            print(f"CSV文件已保存: {csv_filename}")
+            print(f"Excel文件已保存: {excel_filename}")
         print("=" * 60)
 
+        # 预览只需要最新3期的宽表
+        df = df.head(3)
+        wide = pivot_wide(tiers, issues=df['期号'].astype('int64'))
+        df = pd.concat([df, pd.DataFrame(wide.to_numpy(), columns=wide.columns)], axis=1)
+
         # 显示最新3期数据详情
         print("\n最新3期数据预览（含详情页链接）:")
         for i in range(min(3, len(df))):
@@ -2,172 +2,89 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-mpl.use('TkAgg')  # 或 'Qt5Agg'
+mpl.use('Agg')  # 无界面后端，图表由chart_render批量渲染
 import os
-from collections import Counter
 from datetime import datetime
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from chart_render import figure_spec, render_figures
+from dlt_backtest import backtest, summarize
+from dlt_combinations import update_combination_index
+from dlt_draws import encode_draws, number_counts
+from dlt_index import update_index
+from dlt_probability import evaluate, prize_levels_from_history
+from dlt_scoring import PAYOUT_COLUMNS
+from dlt_stats import OVERALL, front_back_pair_counts, grouped_stats
+from dlt_store import DEFAULT_LABEL, DRAW_COLUMNS, cli_label, export_name, load_draws
 
 # 设置支持中文的字体
 mpl.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
 mpl.rcParams['axes.unicode_minus'] = False
 
-# 创建输出目录
-os.makedirs('星期统计', exist_ok=True)
 
-# 读取Excel文件
-df = pd.read_excel('近100期大乐透开奖数据和中奖情况.xlsx')
-
-# 数据预处理
-df['前区号码'] = df['中奖号码_前区'].str.split().apply(lambda x: [int(n) for n in x])
-df['后区号码'] = df['中奖号码_后区'].str.split().apply(lambda x: [int(n) for n in x])
-
-# 按星期分组
-grouped = df.groupby('星期')
-
-
-# 整体频率统计（不区分星期）
-def generate_full_stats():
-    # 前区号码频率统计
-    front_counts = pd.Series([num for sublist in df['前区号码'] for num in sublist]).value_counts().sort_index()
-    front_counts_df = front_counts.reset_index()
-    front_counts_df.columns = ['前区号码', '出现次数']
-    front_counts_df.to_csv('整体前区频率统计.csv', index=False, encoding='utf_8_sig')
-
-    # 后区号码频率统计
-    back_counts = pd.Series([num for sublist in df['后区号码'] for num in sublist]).value_counts().sort_index()
-    back_counts_df = back_counts.reset_index()
-    back_counts_df.columns = ['后区号码', '出现次数']
-    back_counts_df.to_csv('整体后区频率统计.csv', index=False, encoding='utf_8_sig')
-
-    # 组合频率统计
-    heatmap_data = pd.DataFrame(0, index=range(1, 36), columns=range(1, 13))
-    for _, row in df.iterrows():
-        for f in row['前区号码']:
-            for b in row['后区号码']:
-                heatmap_data.loc[f, b] += 1
-    heatmap_data.to_csv('整体前后区组合频率统计.csv', index=True, index_label='前区号码\后区号码', encoding='utf_8_sig')
-
-    # 可视化前区频率
-    plt.figure(figsize=(15, 6))
-    front_counts.plot(kind='bar', color='skyblue')
-    plt.title('大乐透前区号码出现频率 (近100期)', fontsize=15)
+def draw_frequency_bar(counts, title, color):
+    """号码出现频率柱状图"""
+    counts.plot(kind='bar', color=color)
+    plt.title(title, fontsize=15)
     plt.xlabel('号码', fontsize=12)
     plt.ylabel('出现次数', fontsize=12)
     plt.xticks(rotation=0)
     plt.grid(axis='y', linestyle='--', alpha=0.7)
     plt.tight_layout()
-    plt.savefig('整体前区号码频率分布图.png', dpi=300)
-    plt.show()
 
-    # 可视化后区频率
-    plt.figure(figsize=(10, 6))
-    back_counts.plot(kind='bar', color='lightgreen')
-    plt.title('大乐透后区号码出现频率 (近100期)', fontsize=15)
-    plt.xlabel('号码', fontsize=12)
-    plt.ylabel('出现次数', fontsize=12)
-    plt.xticks(rotation=0)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig('整体后区号码频率分布图.png', dpi=300)
-    plt.show()
 
-    # 绘制热力图
-    plt.figure(figsize=(12, 8))
+def draw_combo_heatmap(heatmap_data, title):
+    """前区-后区号码组合热力图"""
     plt.imshow(heatmap_data, cmap='YlOrRd', aspect='auto')
     plt.colorbar(label='组合出现次数')
-    plt.title('前区-后区号码组合热力图', fontsize=15)
+    plt.title(title, fontsize=15)
     plt.xlabel('后区号码', fontsize=12)
     plt.ylabel('前区号码', fontsize=12)
     plt.xticks(range(12), range(1, 13))
     plt.yticks(range(35), range(1, 36))
     plt.tight_layout()
-    plt.savefig('整体前后区组合热力图.png', dpi=300)
-    plt.show()
 
 
-# 按星期生成统计
-wednesday_data = None
-for day, group in grouped:
-    # 保存星期三的数据用于预测
-    if day == '星期三':
-        wednesday_data = group.copy()
-
+# 整体频率统计（不区分星期），图表规格追加到specs
+def generate_full_stats(stats, specs, label=DEFAULT_LABEL):
     # 前区号码频率统计
-    front_counts = pd.Series([num for sublist in group['前区号码'] for num in sublist]).value_counts().sort_index()
+    front_counts = stats[OVERALL]['前区']
     front_counts_df = front_counts.reset_index()
     front_counts_df.columns = ['前区号码', '出现次数']
-    front_counts_df.to_csv(f'星期统计/{day}_前区频率统计.csv', index=False, encoding='utf_8_sig')
+    front_counts_df.to_csv('整体前区频率统计.csv', index=False, encoding='utf_8_sig')
 
     # 后区号码频率统计
-    back_counts = pd.Series([num for sublist in group['后区号码'] for num in sublist]).value_counts().sort_index()
+    back_counts = stats[OVERALL]['后区']
     back_counts_df = back_counts.reset_index()
     back_counts_df.columns = ['后区号码', '出现次数']
-    back_counts_df.to_csv(f'星期统计/{day}_后区频率统计.csv', index=False, encoding='utf_8_sig')
-
-    # 组合频率统计
-    heatmap_data = pd.DataFrame(0, index=range(1, 36), columns=range(1, 13))
-    for _, row in group.iterrows():
-        for f in row['前区号码']:
-            for b in row['后区号码']:
-                heatmap_data.loc[f, b] += 1
-    heatmap_data.to_csv(f'星期统计/{day}_前后区组合频率统计.csv', index=True, index_label='前区号码\后区号码',
-                        encoding='utf_8_sig')
-
-    # 生成可视化图表
-    plt.figure(figsize=(12, 6))
-    front_counts.plot(kind='bar', color='skyblue')
-    plt.title(f'大乐透前区号码出现频率 ({day})', fontsize=15)
-    plt.xlabel('号码', fontsize=12)
-    plt.ylabel('出现次数', fontsize=12)
-    plt.xticks(rotation=0)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(f'星期统计/{day}_前区频率分布图.png', dpi=300)
-    plt.show()
-
-    plt.figure(figsize=(8, 6))
-    back_counts.plot(kind='bar', color='lightgreen')
-    plt.title(f'大乐透后区号码出现频率 ({day})', fontsize=15)
-    plt.xlabel('号码', fontsize=12)
-    plt.ylabel('出现次数', fontsize=12)
-    plt.xticks(rotation=0)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(f'星期统计/{day}_后区频率分布图.png', dpi=300)
-    plt.show()
+    back_counts_df.to_csv('整体后区频率统计.csv', index=False, encoding='utf_8_sig')
 
-    plt.figure(figsize=(12, 8))
-    plt.imshow(heatmap_data, cmap='YlOrRd', aspect='auto')
-    plt.colorbar(label='组合出现次数')
-    plt.title(f'大乐透前区-后区号码组合热力图 ({day})', fontsize=15)
-    plt.xlabel('后区号码', fontsize=12)
-    plt.ylabel('前区号码', fontsize=12)
-    plt.xticks(range(12), range(1, 13))
-    plt.yticks(range(35), range(1, 36))
-    plt.tight_layout()
-    plt.savefig(f'星期统计/{day}_前后区组合热力图.png', dpi=300)
-    plt.show()
+    # 组合频率统计：前区one-hot矩阵的转置乘以后区one-hot矩阵
+    heatmap_data = stats[OVERALL]['前后区组合']
+    heatmap_data.to_csv('整体前后区组合频率统计.csv', index=True, index_label='前区号码\后区号码', encoding='utf_8_sig')
 
-# 生成整体统计
-generate_full_stats()
+    # 可视化前区频率、后区频率和组合热力图
+    specs.append(figure_spec('整体前区号码频率分布图.png', draw_frequency_bar, figsize=(15, 6), counts=front_counts,
+                             title=f'大乐透前区号码出现频率 ({label})', color='skyblue'))
+    specs.append(figure_spec('整体后区号码频率分布图.png', draw_frequency_bar, figsize=(10, 6), counts=back_counts,
+                             title=f'大乐透后区号码出现频率 ({label})', color='lightgreen'))
+    specs.append(figure_spec('整体前后区组合热力图.png', draw_combo_heatmap, figsize=(12, 8), heatmap_data=heatmap_data,
+                             title='前区-后区号码组合热力图'))
 
 
 # 预测函数 - 基于整体数据和星期三历史数据
 def predict_numbers(wed_data, full_df):
     # 计算整体频率
-    full_front_counts = Counter([num for sublist in full_df['前区号码'] for num in sublist])
-    full_back_counts = Counter([num for sublist in full_df['后区号码'] for num in sublist])
+    full_front_counts = number_counts(full_df['号码掩码'].to_numpy(), '前区')
+    full_back_counts = number_counts(full_df['号码掩码'].to_numpy(), '后区')
 
     # 计算星期三频率
-    wed_front_counts = Counter([num for sublist in wed_data['前区号码'] for num in sublist])
-    wed_back_counts = Counter([num for sublist in wed_data['后区号码'] for num in sublist])
+    wed_front_counts = number_counts(wed_data['号码掩码'].to_numpy(), '前区')
+    wed_back_counts = number_counts(wed_data['号码掩码'].to_numpy(), '后区')
 
     # 组合频率统计（星期三）
-    wed_combo_counts = {}
-    for _, row in wed_data.iterrows():
-        for f in row['前区号码']:
-            for b in row['后区号码']:
-                wed_combo_counts[(f, b)] = wed_combo_counts.get((f, b), 0) + 1
+    wed_combo_counts = front_back_pair_counts(wed_data['号码掩码'].to_numpy())
 
     # 1. 保守策略 - 加权热号组合
     # 创建加权频率（50%星期三频率 + 50%整体频率）
@@ -338,72 +255,191 @@ def predict_numbers(wed_data, full_df):
     }
 
 
-# 预测2025年7月2日（周三）的号码
-if wednesday_data is not None:
-    predictions = predict_numbers(wednesday_data, df)
-    print("\n" + "=" * 50)
-    print(f"基于整体和星期三数据的2025年7月2日（周三）大乐透预测")
-    print("=" * 50)
-
-    # 获取整体前区高频号码
-    full_front_counts = Counter([num for sublist in df['前区号码'] for num in sublist])
-    full_top_front = [num for num, count in full_front_counts.most_common(10)]
-
-    # 获取整体后区高频号码
-    full_back_counts = Counter([num for sublist in df['后区号码'] for num in sublist])
-    full_top_back = [num for num, count in full_back_counts.most_common(5)]
-
-    # 获取星期三的前区高频号码
-    wed_front_counts = Counter([num for sublist in wednesday_data['前区号码'] for num in sublist])
-    wed_top_front = [num for num, count in wed_front_counts.most_common(10)]
-
-    # 获取星期三的后区高频号码
-    wed_back_counts = Counter([num for sublist in wednesday_data['后区号码'] for num in sublist])
-    wed_top_back = [num for num, count in wed_back_counts.most_common(5)]
-
-    print("\n整体历史高频号码:")
-    print(f"前区: {', '.join(map(str, full_top_front))}")
-    print(f"后区: {', '.join(map(str, full_top_back))}")
-
-    print("\n星期三历史高频号码:")
-    print(f"前区: {', '.join(map(str, wed_top_front))}")
-    print(f"后区: {', '.join(map(str, wed_top_back))}")
-
-    print("\n预测号码组合:")
-    for strategy, (front, back) in predictions.items():
-        print(f"{strategy}:")
-        print(f"  前区: {', '.join(map(str, front))}")
-        print(f"  后区: {', '.join(map(str, back))}")
-
-    # 保存预测结果
-    prediction_date = "2025-07-02"
-    with open(f'星期统计/预测_{prediction_date}.txt', 'w', encoding='utf-8') as f:
-        f.write(f"大乐透预测结果 ({prediction_date} 星期三)\n")
-        f.write("=" * 50 + "\n")
-
-        f.write("整体历史高频号码:\n")
-        f.write(f"前区: {', '.join(map(str, full_top_front))}\n")
-        f.write(f"后区: {', '.join(map(str, full_top_back))}\n\n")
-
-        f.write("星期三历史高频号码:\n")
-        f.write(f"前区: {', '.join(map(str, wed_top_front))}\n")
-        f.write(f"后区: {', '.join(map(str, wed_top_back))}\n\n")
-
-        f.write("预测号码组合:\n")
+def prediction_odds(predictions, amounts):
+    """每个策略号码以及全部策略合买时的精确中奖概率和期望收益（按历史奖金水平和当前奖池估算）"""
+    rows = {strategy: evaluate([ticket], amounts) for strategy, ticket in predictions.items()}
+    rows['全部策略合计'] = evaluate(list(predictions.values()), amounts)
+    return pd.DataFrame({
+        '注数': [row['注数'] for row in rows.values()],
+        '中奖概率': [row['中奖概率'] for row in rows.values()],
+        '一等奖概率': [row['各奖级中奖概率'][0] for row in rows.values()],
+        '期望奖金(元)': [row['期望奖金'] for row in rows.values()],
+        '期望收益(元)': [row['期望收益'] for row in rows.values()],
+    }, index=pd.Index(list(rows), name='策略'))
+
+
+def run_backtest(seeds=100, label=DEFAULT_LABEL):
+    """逐期滚动回测predict_numbers的六种策略，按各期实际的基本单注奖金汇总各策略的中奖情况"""
+    df = load_draws(columns=DRAW_COLUMNS + PAYOUT_COLUMNS, label=label, fallback_csv=export_name(label))
+    results = backtest(df, seeds=seeds)
+    summary = summarize(results)
+    summary.to_csv('策略回测汇总.csv', index_label='策略', encoding='utf_8_sig')
+    print(f"回测完成，共评估 {len(results)} 注（随机策略每期 {seeds} 个种子）")
+    print(summary.to_string())
+    print("\n回测汇总已保存到: 策略回测汇总.csv")
+
+
+def run_combinations(label=DEFAULT_LABEL):
+    """建立或更新全部组合的预计算索引，输出历史最好奖级分布和一个筛选示例"""
+    df = load_draws(columns=DRAW_COLUMNS, label=label, fallback_csv=export_name(label))
+    index = update_combination_index(df, label)
+    levels = pd.Series(index.best_counts(), name='组合数')
+    levels.index.name = '历史最好奖级'
+    print("全部组合的历史最好奖级分布（0为从未中奖）:")
+    print(levels.to_string())
+
+    ranks = index.select(sum_range=(80, 100), never_drawn=True)
+    print(f"\n前区和值80-100且从未开出的组合共 {len(ranks)} 注，前5注:")
+    print(index.describe(ranks[:5]).to_string(index=False))
+
+
+def main(label=DEFAULT_LABEL):
+    # 创建输出目录
+    os.makedirs('星期统计', exist_ok=True)
+
+    # 从Parquet主存储读取开奖数据（奖级明细只取各奖级单注奖金），主存储不存在时读取本目录的CSV
+    df = load_draws(columns=DRAW_COLUMNS + PAYOUT_COLUMNS, label=label, fallback_csv=export_name(label))
+
+    # 数据预处理：每期编码为一个uint64位掩码（前区35位 + 后区12位），频率统计直接在位掩码上完成
+    df['号码掩码'] = encode_draws(df)
+
+    # 按星期分组
+    grouped = df.groupby('星期')
+
+    # 各星期以及整体的前区、后区频率和前后区组合频率，一次批量算出
+    stats = grouped_stats(df['号码掩码'].to_numpy(), df['星期'])
+
+    # 按星期生成统计
+    specs = []
+    wednesday_data = None
+    for day, group in grouped:
+        # 保存星期三的数据用于预测
+        if day == '星期三':
+            wednesday_data = group.copy()
+
+        # 前区号码频率统计
+        front_counts = stats[day]['前区']
+        front_counts_df = front_counts.reset_index()
+        front_counts_df.columns = ['前区号码', '出现次数']
+        front_counts_df.to_csv(f'星期统计/{day}_前区频率统计.csv', index=False, encoding='utf_8_sig')
+
+        # 后区号码频率统计
+        back_counts = stats[day]['后区']
+        back_counts_df = back_counts.reset_index()
+        back_counts_df.columns = ['后区号码', '出现次数']
+        back_counts_df.to_csv(f'星期统计/{day}_后区频率统计.csv', index=False, encoding='utf_8_sig')
+
+        # 组合频率统计
+        heatmap_data = stats[day]['前后区组合']
+        heatmap_data.to_csv(f'星期统计/{day}_前后区组合频率统计.csv', index=True, index_label='前区号码\后区号码',
+                            encoding='utf_8_sig')
+
+        # 生成可视化图表
+        specs.append(figure_spec(f'星期统计/{day}_前区频率分布图.png', draw_frequency_bar, figsize=(12, 6),
+                                 counts=front_counts, title=f'大乐透前区号码出现频率 ({day})', color='skyblue'))
+        specs.append(figure_spec(f'星期统计/{day}_后区频率分布图.png', draw_frequency_bar, figsize=(8, 6),
+                                 counts=back_counts, title=f'大乐透后区号码出现频率 ({day})', color='lightgreen'))
+        specs.append(figure_spec(f'星期统计/{day}_前后区组合热力图.png', draw_combo_heatmap, figsize=(12, 8),
+                                 heatmap_data=heatmap_data, title=f'大乐透前区-后区号码组合热力图 ({day})'))
+
+    # 生成整体统计
+    generate_full_stats(stats, specs, label)
+
+    # 号码冷热与遗漏：索引保存在主存储目录中，每次运行只追加新开奖的期号
+    index = update_index(df, label)
+    hot_cold = pd.concat({zone: index.frame(zone).join(index.hot_cold(zone)) for zone in ('前区', '后区')},
+                         names=['区域'])
+    hot_cold.to_csv('号码冷热与遗漏统计.csv', encoding='utf_8_sig')
+
+    # 所有图表一次批量渲染，数据未变化的图表跳过
+    render_figures(specs)
+
+    # 预测2025年7月2日（周三）的号码
+    if wednesday_data is not None:
+        predictions = predict_numbers(wednesday_data, df)
+        print("\n" + "=" * 50)
+        print(f"基于整体和星期三数据的2025年7月2日（周三）大乐透预测")
+        print("=" * 50)
+
+        # 获取整体前区高频号码
+        full_front_counts = number_counts(df['号码掩码'].to_numpy(), '前区')
+        full_top_front = [num for num, count in full_front_counts.most_common(10)]
+
+        # 获取整体后区高频号码
+        full_back_counts = number_counts(df['号码掩码'].to_numpy(), '后区')
+        full_top_back = [num for num, count in full_back_counts.most_common(5)]
+
+        # 获取星期三的前区高频号码
+        wed_front_counts = number_counts(wednesday_data['号码掩码'].to_numpy(), '前区')
+        wed_top_front = [num for num, count in wed_front_counts.most_common(10)]
+
+        # 获取星期三的后区高频号码
+        wed_back_counts = number_counts(wednesday_data['号码掩码'].to_numpy(), '后区')
+        wed_top_back = [num for num, count in wed_back_counts.most_common(5)]
+
+        print("\n整体历史高频号码:")
+        print(f"前区: {', '.join(map(str, full_top_front))}")
+        print(f"后区: {', '.join(map(str, full_top_back))}")
+
+        print("\n星期三历史高频号码:")
+        print(f"前区: {', '.join(map(str, wed_top_front))}")
+        print(f"后区: {', '.join(map(str, wed_top_back))}")
+
+        print("\n预测号码组合:")
         for strategy, (front, back) in predictions.items():
-            f.write(f"{strategy}:\n")
-            f.write(f"  前区: {', '.join(map(str, front))}\n")
-            f.write(f"  后区: {', '.join(map(str, back))}\n\n")
-
-    print("\n预测结果已保存到: 星期统计/预测_2025-07-02.txt")
-else:
-    print("警告: 没有找到星期三的历史数据，无法进行预测")
-
-print("\n统计完成！所有星期分类数据已保存到'星期统计'目录中")
-print("包含以下文件：")
-print("1. 各星期前区频率统计.csv")
-print("2. 各星期后区频率统计.csv")
-print("3. 各星期前后区组合频率统计.csv")
-print("4. 各星期频率分布图.png")
-print("5. 整体统计文件（整体前区频率统计.csv等）")
-print("6. 预测结果文件")
\ No newline at end of file
+            print(f"{strategy}:")
+            print(f"  前区: {', '.join(map(str, front))}")
+            print(f"  后区: {', '.join(map(str, back))}")
+
+        # 中奖概率与期望收益：组合数精确计算，奖金按历史水平，一等奖按当前奖池的封顶金额
+        odds = prediction_odds(predictions, prize_levels_from_history(df)).to_string(
+            formatters={'中奖概率': '{:.4%}'.format, '一等奖概率': '{:.3e}'.format},
+            float_format='{:.2f}'.format)
+        print("\n中奖概率与期望收益:")
+        print(odds)
+
+        # 保存预测结果
+        prediction_date = "2025-07-02"
+        with open(f'星期统计/预测_{prediction_date}.txt', 'w', encoding='utf-8') as f:
+            f.write(f"大乐透预测结果 ({prediction_date} 星期三)\n")
+            f.write("=" * 50 + "\n")
+
+            f.write("整体历史高频号码:\n")
+            f.write(f"前区: {', '.join(map(str, full_top_front))}\n")
+            f.write(f"后区: {', '.join(map(str, full_top_back))}\n\n")
+
+            f.write("星期三历史高频号码:\n")
+            f.write(f"前区: {', '.join(map(str, wed_top_front))}\n")
+            f.write(f"后区: {', '.join(map(str, wed_top_back))}\n\n")
+
+            f.write("预测号码组合:\n")
+            for strategy, (front, back) in predictions.items():
+                f.write(f"{strategy}:\n")
+                f.write(f"  前区: {', '.join(map(str, front))}\n")
+                f.write(f"  后区: {', '.join(map(str, back))}\n\n")
+
+            f.write("中奖概率与期望收益:\n")
+            f.write(odds + "\n")
+
+        print("\n预测结果已保存到: 星期统计/预测_2025-07-02.txt")
+    else:
+        print("警告: 没有找到星期三的历史数据，无法进行预测")
+
+    print("\n统计完成！所有星期分类数据已保存到'星期统计'目录中")
+    print("包含以下文件：")
+    print("1. 各星期前区频率统计.csv")
+    print("2. 各星期后区频率统计.csv")
+    print("3. 各星期前后区组合频率统计.csv")
+    print("4. 各星期频率分布图.png")
+    print("5. 整体统计文件（整体前区频率统计.csv等）")
+    print("6. 预测结果文件")
+    print("7. 号码冷热与遗漏统计.csv")
+
+
+# --history：分析 Homework4_1_1.py --backfill 抓取的全部历史数据，可与其他选项组合
+if __name__ == "__main__" and '--backtest' in sys.argv:
+    run_backtest(label=cli_label())
+elif __name__ == "__main__" and '--combinations' in sys.argv:
+    run_combinations(cli_label())
+elif __name__ == "__main__":
+    main(cli_label())
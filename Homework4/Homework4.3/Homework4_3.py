@@ -1,31 +1,37 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-mpl.use('TkAgg')  # 或 'Qt5Agg'、'Agg'
+mpl.use('Agg')  # 无界面后端，图表由chart_render批量渲染
 import seaborn as sns
 from scipy import stats
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from chart_render import figure_spec, render_figures
+from dlt_amounts import normalize_amounts
+from dlt_draws import encode_draws, explode_numbers
+from dlt_store import DEFAULT_LABEL, DRAW_COLUMNS, cli_label, export_name, load_draws
+
 # 设置支持中文的字体
 mpl.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS']
 mpl.rcParams['axes.unicode_minus'] = False
 
 
-def load_and_preprocess(file_path):
-    """加载并预处理数据"""
-    df = pd.read_csv(file_path)
+def load_and_preprocess(file_path, label=DEFAULT_LABEL):
+    """加载并预处理数据，优先读取Parquet主存储中的label数据集，file_path为主存储不存在时使用的CSV"""
+    df = load_draws(columns=DRAW_COLUMNS, label=label, fallback_csv=file_path)
 
     # 日期转换
     df['开奖日期'] = pd.to_datetime(df['开奖日期'])
 
-    # 销售额转换（去除逗号）
-    df['总销售额(元)'] = df['总销售额(元)'].astype(str).str.replace(',', '').astype(float)
-
-    # 拆分前区号码 (使用str.split()方法)
-    df['前区号码'] = df['中奖号码_前区'].str.split().apply(lambda x: [int(n) for n in x])
+    # 销售额转换：主存储中已是整数，CSV的千分位逗号在读取时处理，其余格式统一交给normalize_amounts，无法解析的记为NaN
+    amounts, invalid = normalize_amounts(df['总销售额(元)'])
+    df['总销售额(元)'] = np.where(invalid, np.nan, amounts)
 
-    # 拆开后区号码 (使用str.split()方法)
-    df['后区号码'] = df['中奖号码_后区'].str.split().apply(lambda x: [int(n) for n in x])
+    # 前后区号码编码为位掩码，每期一个uint64（前区35位 + 后区12位）
+    df['号码掩码'] = encode_draws(df)
 
     # 验证星期列
     valid_days = ['星期一', '星期三', '星期六']
@@ -36,15 +42,8 @@ def load_and_preprocess(file_path):
     return df
 
 
-def analyze_sales(df):
-    """分析销售额特征"""
-    # 按星期分组统计
-    grouped = df.groupby('星期')
-    sales_stats = grouped['总销售额(元)'].agg(['mean', 'median', 'std', 'count'])
-
-    # 销售额可视化
-    plt.figure(figsize=(14, 10))
-
+def draw_sales(df, sales_mean):
+    """销售额特征图（四个子图）"""
     # 箱线图
     plt.subplot(2, 2, 1)
     sns.boxplot(x='星期', y='总销售额(元)', data=df, order=['星期一', '星期三', '星期六'])
@@ -53,8 +52,6 @@ def analyze_sales(df):
 
     # 条形图
     plt.subplot(2, 2, 2)
-    sales_mean = grouped['总销售额(元)'].mean().div(1000000)
-    sales_mean = sales_mean.reindex(['星期一', '星期三', '星期六'])
     sales_mean.plot(kind='bar', color=['skyblue', 'lightgreen', 'salmon'])
     plt.title('平均销售额对比')
     plt.ylabel('平均销售额(百万元)')
@@ -77,14 +74,25 @@ def analyze_sales(df):
     plt.xlabel('销售额(元)')
 
     plt.tight_layout()
-    plt.savefig('销售额特征.png', dpi=300)
-    plt.show()
+
+
+def analyze_sales(df, specs):
+    """分析销售额特征，销售额特征图的规格追加到specs"""
+    # 按星期分组统计
+    grouped = df.groupby('星期')
+    sales_stats = grouped['总销售额(元)'].agg(['mean', 'median', 'std', 'count'])
+
+    # 销售额可视化
+    sales_mean = grouped['总销售额(元)'].mean().div(1000000)
+    sales_mean = sales_mean.reindex(['星期一', '星期三', '星期六'])
+    specs.append(figure_spec('销售额特征.png', draw_sales, figsize=(14, 10),
+                             df=df[['星期', '开奖日期', '总销售额(元)']], sales_mean=sales_mean))
 
     return sales_stats
 
 
-def analyze_numbers(df):
-    """分析号码分布特征"""
+def analyze_numbers(df, specs):
+    """分析号码分布特征，号码分布图的规格追加到specs"""
     # 按星期分组
     grouped = df.groupby('星期')
 
@@ -97,19 +105,12 @@ def analyze_numbers(df):
         day_data = grouped.get_group(day) if day in grouped.groups else pd.DataFrame()
 
         if not day_data.empty:
-            # 处理前区号码
-            for nums in day_data['前区号码']:
-                for num in nums:
-                    front_data['号码'].append(num)
-                    front_data['区域'].append('前区')
-                    front_data['星期'].append(day)
-
-            # 处理后区号码
-            for nums in day_data['后区号码']:
-                for num in nums:
-                    back_data['号码'].append(num)
-                    back_data['区域'].append('后区')
-                    back_data['星期'].append(day)
+            # 从位掩码直接展开前区、后区号码
+            for zone, zone_data in (('前区', front_data), ('后区', back_data)):
+                _, numbers = explode_numbers(day_data['号码掩码'].to_numpy(), zone)
+                zone_data['号码'].extend(numbers.tolist())
+                zone_data['区域'].extend([zone] * len(numbers))
+                zone_data['星期'].extend([day] * len(numbers))
 
     # 创建数据框
     front_df = pd.DataFrame(front_data)
@@ -118,8 +119,13 @@ def analyze_numbers(df):
     numbers_df = pd.concat([front_df, back_df])
 
     # 号码频率可视化
-    plt.figure(figsize=(16, 12))
+    specs.append(figure_spec('号码分布.png', draw_numbers, figsize=(16, 12), front_df=front_df, back_df=back_df))
+
+    return numbers_df
 
+
+def draw_numbers(front_df, back_df):
+    """号码分布图：前后区分布对比和出现频率热力图"""
     # 前区号码分布
     plt.subplot(2, 2, 1)
     if not front_df.empty:
@@ -159,10 +165,6 @@ def analyze_numbers(df):
         plt.ylabel('开奖日')
 
     plt.tight_layout()
-    plt.savefig('号码分布.png', dpi=300)
-    plt.show()
-
-    return numbers_df
 
 
 def statistical_analysis(df):
@@ -191,9 +193,9 @@ def statistical_analysis(df):
         for day in ['星期一', '星期三', '星期六']:
             if day in grouped.groups:
                 day_data = grouped.get_group(day)
-                for nums in day_data[f'{num_type}号码']:
-                    all_numbers.extend(nums)
-                    all_days.extend([day] * len(nums))
+                _, numbers = explode_numbers(day_data['号码掩码'].to_numpy(), num_type)
+                all_numbers.extend(numbers.tolist())
+                all_days.extend([day] * len(numbers))
 
         # 创建列联表
         if all_numbers:
@@ -215,10 +217,10 @@ def statistical_analysis(df):
     return p_sales, results
 
 
-def main(file_path):
+def main(file_path, label=DEFAULT_LABEL):
     """主分析流程"""
     # 1. 加载和预处理数据
-    df = load_and_preprocess(file_path)
+    df = load_and_preprocess(file_path, label)
 
     print(f"数据集大小: {df.shape}")
     print("开奖日分布:")
@@ -226,14 +228,16 @@ def main(file_path):
     print(day_counts)
 
     # 2. 销售额分析
-    sales_stats = analyze_sales(df)
+    specs = []
+    sales_stats = analyze_sales(df, specs)
     print("\n销售额统计:")
     # 确保按顺序输出
     sales_stats = sales_stats.reindex(['星期一', '星期三', '星期六'])
     print(sales_stats)
 
     # 3. 号码分布分析
-    numbers_df = analyze_numbers(df)
+    numbers_df = analyze_numbers(df, specs)
+    render_figures(specs)
 
     # 4. 统计检验
     p_sales, p_numbers = statistical_analysis(df)
@@ -258,6 +262,7 @@ def main(file_path):
 
 
 if __name__ == "__main__":
-    df = "近100期大乐透开奖数据和中奖情况.csv"
-    main(df)
+    # --history：分析 Homework4_1_1.py --backfill 抓取的全部历史数据
+    label = cli_label()
+    main(export_name(label), label)
     
\ No newline at end of file
@@ -1,10 +1,13 @@
-import requests
+import os
+import sys
 import pandas as pd
 import time
-import random
 from tqdm import tqdm
 import json
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from crawl_utils import RandomDelay, default_cache
+
 # 配置请求头
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36',
@@ -14,13 +17,18 @@ headers = {
     'Connection': 'keep-alive'
 }
 
+# 排行榜和专家详情每天更新一次，缓存一天；随机延时只在真正发送请求时生效
+CACHE_TTL = 24 * 3600
+list_delay = RandomDelay(0.3, 0.8)
+detail_delay = RandomDelay(0.2, 0.6)
+
 
 def fetch_expert_list(page):
     """获取单页专家列表数据"""
     url = f"https://i.cmzj.net/expert/rankingDetail?limit=10&page={page}&lottery=4&issueNum=7&target=esm&classPay=2"
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = default_cache.get(url, headers=headers, timeout=10, ttl=CACHE_TTL, rate_limiter=list_delay)
         response.raise_for_status()
         data = response.json()
 
@@ -39,7 +47,7 @@ def fetch_expert_detail(expert_id):
     url = f"https://i.cmzj.net/expert/queryExpertById?expertId={expert_id}"
 
     try:
-        response = requests.get(url, headers=headers, timeout=8)
+        response = default_cache.get(url, headers=headers, timeout=8, ttl=CACHE_TTL, rate_limiter=detail_delay)
         response.raise_for_status()
         data = response.json()
 
@@ -62,8 +70,6 @@ def main():
         experts = fetch_expert_list(page)
         if experts:
             all_experts.extend(experts)
-        # 随机延时防止请求过快
-        time.sleep(random.uniform(0.3, 0.8))
 
     print(f"共获取到 {len(all_experts)} 位专家的基本信息")
 
@@ -122,9 +128,6 @@ def main():
         full_data.append(expert_data)
         pbar.update(1)
 
-        # 随机延时
-        time.sleep(random.uniform(0.2, 0.6))
-
     pbar.close()
 
     # 保存到CSV文件
@@ -1,10 +1,15 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-mpl.use('TkAgg')  # 或 'Qt5Agg'
+mpl.use('Agg')  # 无界面后端，图表由chart_render批量渲染
 import seaborn as sns
 import numpy as np
 from scipy.stats import pearsonr
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from chart_render import figure_spec, render_figures
 
 # 设置中文显示
 plt.rcParams['font.sans-serif'] = ['SimHei']  # 用来正常显示中文标签
@@ -67,88 +72,79 @@ def analyze_data(df):
     return df, analysis_results
 
 
-def create_visualizations(df, analysis_results):
-    """创建可视化图表并保存"""
-    corr_matrix = analysis_results['correlation']
-
-    # 1. 相关性热力图
-    plt.figure(figsize=(12, 8))
+def draw_correlation_heatmap(corr_matrix):
+    """专家特征相关性热力图"""
     sns.heatmap(corr_matrix, annot=True, fmt=".2f", cmap='YlOrRd',
                 center=0, vmin=-1, vmax=1, linewidths=0.5)
     plt.title('专家特征相关性热力图', fontsize=15)
     plt.xticks(fontsize=10, rotation=45)
     plt.yticks(fontsize=10)
     plt.tight_layout()
-    plt.savefig('专家特征相关性热力图.png', dpi=300, bbox_inches='tight')
-    plt.show()
+
+
+def draw_rate_histogram(rates):
+    """专家中奖率分布直方图"""
+    plt.hist(rates, bins=20, color='skyblue', edgecolor='black')
+    plt.title('专家中奖率分布', fontsize=15)
+    plt.xlabel('中奖率', fontsize=12)
+    plt.ylabel('专家数量', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+
+
+def draw_rate_relation(data, column, xlabel, color, trend_style):
+    """某一特征与中奖率的散点图，附线性趋势线和相关系数"""
+    plt.scatter(data[column], data['中奖率'], alpha=0.6, color=color)
+
+    # 添加标题和标签
+    plt.title(f'{column}与中奖率关系', fontsize=15)
+    plt.xlabel(xlabel, fontsize=12)
+    plt.ylabel('中奖率', fontsize=12)
+    plt.grid(True, linestyle='--', alpha=0.5)
+
+    # 添加趋势线
+    valid_data = data.dropna()
+    if len(valid_data) > 1:
+        z = np.polyfit(valid_data[column], valid_data['中奖率'], 1)  # 线性拟合
+        p = np.poly1d(z)
+        plt.plot(valid_data[column], p(valid_data[column]), trend_style)
+
+        # 添加相关系数标注
+        r = np.corrcoef(valid_data[column], valid_data['中奖率'])[0, 1]
+        plt.text(0.05, 0.95, f'相关系数 r = {r:.2f}',
+                 transform=plt.gca().transAxes,
+                 fontsize=12, verticalalignment='top',
+                 bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
+
+    plt.tight_layout()
+
+
+def create_visualizations(df, analysis_results):
+    """创建可视化图表并保存，数据未变化的图表跳过"""
+    corr_matrix = analysis_results['correlation']
+
+    # 1. 相关性热力图
+    specs = [figure_spec('专家特征相关性热力图.png', draw_correlation_heatmap, figsize=(12, 8),
+                         savefig={'bbox_inches': 'tight'}, corr_matrix=corr_matrix)]
 
     # 2. 中奖率分布图
     if '中奖率' in df.columns:
-        plt.figure(figsize=(10, 6))
-        plt.hist(df['中奖率'].dropna(), bins=20, color='skyblue', edgecolor='black')
-        plt.title('专家中奖率分布', fontsize=15)
-        plt.xlabel('中奖率', fontsize=12)
-        plt.ylabel('专家数量', fontsize=12)
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        plt.savefig('专家中奖率分布.png', dpi=300)
-        plt.show()
+        specs.append(figure_spec('专家中奖率分布.png', draw_rate_histogram, figsize=(10, 6),
+                                 rates=df['中奖率'].dropna()))
 
     # 3. 彩龄与中奖率关系图
     if '彩龄' in df.columns and '中奖率' in df.columns:
-        plt.figure(figsize=(10, 6))
-        plt.scatter(df['彩龄'], df['中奖率'], alpha=0.6, color='green')
-        plt.title('彩龄与中奖率关系', fontsize=15)
-        plt.xlabel('彩龄(年)', fontsize=12)
-        plt.ylabel('中奖率', fontsize=12)
-        plt.grid(True, linestyle='--', alpha=0.5)
-
-        # 添加趋势线
-        valid_data = df[['彩龄', '中奖率']].dropna()
-        if len(valid_data) > 1:
-            z = np.polyfit(valid_data['彩龄'], valid_data['中奖率'], 1)
-            p = np.poly1d(z)
-            plt.plot(valid_data['彩龄'], p(valid_data['彩龄']), "r--")
-
-            # 添加相关系数标注
-            r = np.corrcoef(valid_data['彩龄'], valid_data['中奖率'])[0, 1]
-            plt.text(0.05, 0.95, f'相关系数 r = {r:.2f}',
-                     transform=plt.gca().transAxes,
-                     fontsize=12, verticalalignment='top',
-                     bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-
-        plt.tight_layout()
-        plt.savefig('彩龄与中奖率关系.png', dpi=300)
-        plt.show()
-
-    # 4. 文章数量与中奖率关系图
+        specs.append(figure_spec('彩龄与中奖率关系.png', draw_rate_relation, figsize=(10, 6),
+                                 data=df[['彩龄', '中奖率']], column='彩龄', xlabel='彩龄(年)',
+                                 color='green', trend_style='r--'))
+
+    # 4. 文章数量与中奖率关系图（蓝色散点、品红色虚线表示文章相关）
     if '文章数量' in df.columns and '中奖率' in df.columns:
-        plt.figure(figsize=(10, 6))
-        plt.scatter(df['文章数量'], df['中奖率'], alpha=0.6, color='blue')  # 使用蓝色表示文章相关
-
-        # 添加标题和标签
-        plt.title('文章数量与中奖率关系', fontsize=15)
-        plt.xlabel('文章数量(篇)', fontsize=12)
-        plt.ylabel('中奖率', fontsize=12)
-        plt.grid(True, linestyle='--', alpha=0.5)
-
-        # 添加趋势线
-        valid_data = df[['文章数量', '中奖率']].dropna()
-        if len(valid_data) > 1:
-            z = np.polyfit(valid_data['文章数量'], valid_data['中奖率'], 1)  # 线性拟合
-            p = np.poly1d(z)
-            plt.plot(valid_data['文章数量'], p(valid_data['文章数量']), "m--")  # 使用品红色虚线
-
-            # 添加相关系数标注
-            r = np.corrcoef(valid_data['文章数量'], valid_data['中奖率'])[0, 1]
-            plt.text(0.05, 0.95, f'相关系数 r = {r:.2f}',
-                     transform=plt.gca().transAxes,
-                     fontsize=12, verticalalignment='top',
-                     bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
-
-        plt.tight_layout()
-        plt.savefig('文章数量与中奖率关系.png', dpi=300)
-        plt.show()
+        specs.append(figure_spec('文章数量与中奖率关系.png', draw_rate_relation, figsize=(10, 6),
+                                 data=df[['文章数量', '中奖率']], column='文章数量', xlabel='文章数量(篇)',
+                                 color='blue', trend_style='m--'))
+
+    render_figures(specs)
 
 
 def main():
@@ -0,0 +1,113 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+# 所有图表共用的中文字体设置；子进程不会继承父进程的rcParams，因此随图表规格一起传递
+CHINESE_RC = {
+    'font.sans-serif': ['SimHei', 'Microsoft YaHei', 'Arial Unicode MS'],
+    'axes.unicode_minus': False,
+}
+
+MANIFEST_NAME = 'chart_cache.json'
+
+
+def figure_spec(path, draw, figsize, dpi=300, facecolor=None, savefig=None, rc=None, version=None, **data):
+    """声明一张图表：由draw(**data)在当前画布上作图，再保存到path
+
+    draw必须是模块级函数（子进程中按名字导入），data中只放作图需要的数据。
+    draw所在模块的源码会计入缓存键；作图还依赖其他模块时，由调用方通过version传入其版本号。
+    """
+    return {
+        'path': path,
+        'draw': draw,
+        'data': data,
+        'version': version,
+        'figsize': figsize,
+        'dpi': dpi,
+        'facecolor': facecolor,
+        'savefig': savefig or {},
+        'rc': rc or CHINESE_RC,
+    }
+
+
+@lru_cache(maxsize=None)
+def module_source(name):
+    """模块的完整源码（取不到时为空字符串），同一模块的多张图表只读取一次"""
+    try:
+        return inspect.getsource(sys.modules[name])
+    except (KeyError, OSError, TypeError):
+        return ''
+
+
+def spec_hash(spec):
+    """由作图函数所在模块和本模块的源码、数据和渲染参数计算缓存键，任何一项变化都会重绘
+
+    按整个模块而不是单个函数取源码，作图函数调用的辅助函数、常量和样式设置改动后也会重绘。
+    """
+    draw = spec['draw']
+    payload = pickle.dumps((draw.__module__, draw.__qualname__, module_source(draw.__module__),
+                            module_source(__name__), spec.get('version'), spec['data'], spec['figsize'],
+                            spec['dpi'], spec['facecolor'], sorted(spec['savefig'].items()),
+                            sorted(spec['rc'].items())), protocol=4)
+    return hashlib.sha256(payload).hexdigest()
+
+
+def render_figure(spec):
+    """渲染并保存单张图表（进程池中的工作函数）"""
+    plt.rcParams.update(spec['rc'])
+    figure = plt.figure(figsize=spec['figsize'], facecolor=spec['facecolor'])
+    try:
+        spec['draw'](**spec['data'])
+        plt.savefig(spec['path'], dpi=spec['dpi'], **spec['savefig'])
+    finally:
+        plt.close(figure)
+    return spec['path']
+
+
+def render_figures(specs, output_dir='.', workers=None):
+    """批量渲染图表，跳过数据和作图代码都没有变化的图片
+
+    使用Agg后端，不弹出窗口；需要重绘的图表在多个进程中并行渲染，
+    每张图的缓存键记录在输出目录的chart_cache.json中。返回实际重绘的文件列表。
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    pending = []
+    for spec in specs:
+        key = spec_hash(spec)
+        if manifest.get(spec['path']) == key and os.path.exists(spec['path']):
+            print(f"图表未变化，跳过: {spec['path']}")
+            continue
+        pending.append((spec, key))
+
+    if pending:
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        if workers <= 1:
+            for spec, _ in pending:
+                render_figure(spec)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(render_figure, spec) for spec, _ in pending]:
+                    future.result()
+
+        for spec, key in pending:
+            manifest[spec['path']] = key
+            print(f"图表已保存: {spec['path']}")
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    return [spec['path'] for spec, _ in pending]
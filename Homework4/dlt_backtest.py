@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+from dlt_draws import (BACK_NUMBERS, BACK_SHIFT, FRONT_NUMBERS, encode_draws, match_counts, one_hot)
+from dlt_scoring import PAYOUT_COLUMNS, prize_amounts
+from dlt_tiers import LEVELS, prize_levels
+
+# 与Homework4_2.predict_numbers返回的六种策略一一对应；"星期三高频"推广为目标期所在星期的高频号码
+STRATEGIES = ['保守策略(加权)', '平衡策略', '激进策略', '组合优化', '同星期高频', '整体高频']
+
+_FRONT_BITS = np.uint64(1) << np.arange(FRONT_NUMBERS, dtype=np.uint64)
+_BACK_BITS = np.uint64(1) << (np.arange(BACK_NUMBERS, dtype=np.uint64) + BACK_SHIFT)
+
+
+def _prefix_stats(matrix, codes=None):
+    """每一期之前（不含本期）的出现次数和最近一次出现的期序号（未出现为-1）
+
+    codes不为None时只统计与本期同组（同星期）的历史。
+    """
+    counts = np.zeros(matrix.shape, dtype=np.int64)
+    last = np.full(matrix.shape, -1, dtype=np.int64)
+    if codes is None:
+        codes = np.zeros(len(matrix), dtype=np.int64)
+    for code in np.unique(codes):
+        rows = np.flatnonzero(codes == code)
+        sub = matrix[rows].astype(np.int64)
+        counts[rows] = np.cumsum(sub, axis=0) - sub
+        seen = np.maximum.accumulate(np.where(sub > 0, rows[:, None], -1), axis=0)
+        last[rows[1:]] = seen[:-1]
+    return counts, last
+
+
+def _counter_order(counts, last):
+    """Counter.most_common的顺序：次数降序；次数相同时按在倒序历史中首次出现的先后，
+    即最近一次出现越晚越靠前，同一期内号码小的在前"""
+    numbers = np.broadcast_to(np.arange(counts.shape[-1]), counts.shape)
+    return np.lexsort((numbers, -last, -counts), axis=-1)
+
+
+def _top(order, k, valid=None):
+    """按order取每行前k个，返回布尔选择矩阵；valid为False的号码不参与（不在Counter中）"""
+    selected = np.zeros(order.shape, dtype=bool)
+    rows = np.arange(len(order))[:, None]
+    picked = order[:, :k]
+    selected[rows, picked] = True if valid is None else valid[rows, picked]
+    return selected
+
+
+def _sample(rng, pool, k, seeds):
+    """从每行的候选集合中无放回随机取k个（np.random.choice(..., replace=False)的批量版本）
+
+    pool为[期数, 号码个数]的布尔矩阵，k为每行要取的个数，返回[种子, 期数, 号码个数]的选择矩阵。
+    候选不足k个时原函数会抛出ValueError，这里取整个候选集合。
+    """
+    keys = np.where(pool, rng.random((seeds,) + pool.shape), 2.0)
+    ranks = keys.argsort(axis=-1).argsort(axis=-1)
+    return (ranks < np.broadcast_to(k, pool.shape[:1])[:, None]) & pool
+
+
+def _pack(selected, bits):
+    """布尔选择矩阵 -> 位掩码"""
+    return np.where(selected, bits, np.uint64(0)).sum(axis=-1, dtype=np.uint64)
+
+
+def _pools(weighted, full_counts, full_last, high_size, mid_band, low_limit, high_min, mid_min, low_min):
+    """平衡、激进策略的高频、中频、低频候选集合（含predict_numbers中的各种补充规则）"""
+    high_threshold = np.percentile(weighted, 80, axis=1)[:, None]
+    mid_threshold = np.percentile(weighted, 50, axis=1)[:, None]
+    low_threshold = np.percentile(weighted, 30, axis=1)[:, None]
+
+    high = weighted >= high_threshold
+    mid = (weighted >= mid_threshold) & (weighted < high_threshold)
+    low = weighted < low_threshold
+
+    short = high.sum(axis=1) < high_min
+    full_top = _top(_counter_order(full_counts, full_last), high_size, full_counts > 0)
+    high[short] = full_top[short]
+
+    short = mid.sum(axis=1) < mid_min
+    mid[short] = ((full_counts >= mid_band[0]) & (full_counts <= mid_band[1]))[short]
+
+    short = low.sum(axis=1) < low_min
+    low[short] = (full_counts < low_limit)[short]
+    return high, mid, low
+
+
+def strategy_tickets(masks, codes, targets, seeds=100, random_state=None):
+    """对每个目标期，只用它之前的开奖数据重跑predict_numbers的六种策略
+
+    masks为按开奖日期升序排列的位掩码，codes为各期的星期编码，targets为目标期的位置。
+    返回 {策略: 位掩码数组}，随机策略的形状为[seeds, 目标期数]，其余为[1, 目标期数]。
+    结果与predict_numbers在倒序排列（最新一期在前）的历史数据上得到的号码相同，
+    平衡、激进策略的随机抽样改为一次性生成全部种子的随机数。
+    """
+    rng = np.random.default_rng(random_state)
+    masks = np.asarray(masks, dtype=np.uint64)
+    codes = np.asarray(codes)
+    targets = np.asarray(targets, dtype=np.int64)
+
+    front = one_hot(masks, '前区')
+    back = one_hot(masks, '后区')
+    pairs = (front[:, :, None] & back[:, None, :]).reshape(len(masks), -1)
+
+    full_front, full_front_last = (a[targets] for a in _prefix_stats(front))
+    full_back, full_back_last = (a[targets] for a in _prefix_stats(back))
+    day_front, day_front_last = (a[targets] for a in _prefix_stats(front, codes))
+    day_back, day_back_last = (a[targets] for a in _prefix_stats(back, codes))
+    day_pairs, day_pairs_last = (a[targets] for a in _prefix_stats(pairs, codes))
+
+    tickets = {}
+
+    # 1. 保守策略：加权频率最高的号码（dict按号码顺序建立，次数相同时号码小的在前）
+    weighted_front = 0.5 * day_front + 0.5 * full_front
+    weighted_back = 0.6 * day_back + 0.4 * full_back
+    front_order = np.argsort(-weighted_front, axis=1, kind='stable')
+    back_order = np.argsort(-weighted_back, axis=1, kind='stable')
+    tickets['保守策略(加权)'] = (_pack(_top(front_order, 5), _FRONT_BITS)
+                           | _pack(_top(back_order, 2), _BACK_BITS))[None, :]
+
+    # 2、3. 平衡策略和激进策略：候选集合按期确定，再对全部种子一次性抽样
+    high, mid, low = _pools(weighted_front, full_front, full_front_last, 10, (5, 7), 4, 3, 5, 2)
+    high_b, mid_b, low_b = _pools(weighted_back, full_back, full_back_last, 3, (3, 4), 3, 1, 1, 1)
+    has_mid = mid.any(axis=1)[:, None]
+    has_low = low.any(axis=1)[:, None]
+    has_mid_b = mid_b.any(axis=1)[:, None]
+    has_low_b = low_b.any(axis=1)[:, None]
+
+    first = np.minimum(3, high.sum(axis=1))
+    balanced = _sample(rng, high, first, seeds) | _sample(rng, np.where(has_mid, mid, high), 5 - first, seeds)
+    balanced_b = _sample(rng, high_b, 1, seeds) | _sample(rng, np.where(has_mid_b, mid_b, high_b), 1, seeds)
+    tickets['平衡策略'] = _pack(balanced, _FRONT_BITS) | _pack(balanced_b, _BACK_BITS)
+
+    aggressive = (_sample(rng, high, 2, seeds)
+                  | _sample(rng, np.where(has_mid, mid, high), 1, seeds)
+                  | _sample(rng, np.where(has_low, low, mid), 2, seeds))
+    aggressive_b = _sample(rng, high_b, 1, seeds) | _sample(rng, np.where(has_low_b, low_b, mid_b), 1, seeds)
+    tickets['激进策略'] = _pack(aggressive, _FRONT_BITS) | _pack(aggressive_b, _BACK_BITS)
+
+    # 4. 组合优化：同星期最高频的20个前后区组合，按加权值依次选号，不足时用加权高频号码补齐
+    rows = np.arange(len(targets))[:, None]
+    top_pairs = _counter_order(day_pairs, day_pairs_last)[:, :20]
+    present = day_pairs[rows, top_pairs] > 0
+    pair_front, pair_back = np.divmod(top_pairs, BACK_NUMBERS)
+    weights = 0.7 * day_pairs[rows, top_pairs] + 0.3 * (full_front[rows, pair_front] + full_back[rows, pair_back])
+    by_weight = np.argsort(-np.where(present, weights, -np.inf), axis=1, kind='stable')
+    pair_front = pair_front[rows, by_weight]
+    pair_back = pair_back[rows, by_weight]
+    present = present[rows, by_weight]
+
+    combo = np.zeros(front.shape[1:], dtype=bool)[None, :].repeat(len(targets), axis=0)
+    combo_b = np.zeros(back.shape[1:], dtype=bool)[None, :].repeat(len(targets), axis=0)
+    for i in range(top_pairs.shape[1]):
+        f, b = pair_front[:, i], pair_back[:, i]
+        take = present[:, i] & (combo.sum(axis=1) < 5)
+        combo[take, f[take]] = True
+        take = present[:, i] & (combo_b.sum(axis=1) < 2)
+        combo_b[take, b[take]] = True
+    for selected, order, size in ((combo, front_order, 5), (combo_b, back_order, 2)):
+        remaining = ~selected[rows, order]
+        needed = size - selected.sum(axis=1)[:, None]
+        fill = remaining & (np.cumsum(remaining, axis=1) <= needed)
+        selected[rows, order] |= fill
+    tickets['组合优化'] = (_pack(combo, _FRONT_BITS) | _pack(combo_b, _BACK_BITS))[None, :]
+
+    # 5、6. 同星期高频和整体高频：most_common的前5个前区号码、前2个后区号码
+    for name, (f_counts, f_last, b_counts, b_last) in (
+            ('同星期高频', (day_front, day_front_last, day_back, day_back_last)),
+            ('整体高频', (full_front, full_front_last, full_back, full_back_last))):
+        tickets[name] = (_pack(_top(_counter_order(f_counts, f_last), 5, f_counts > 0), _FRONT_BITS)
+                         | _pack(_top(_counter_order(b_counts, b_last), 2, b_counts > 0), _BACK_BITS))[None, :]
+
+    return tickets
+
+
+def backtest(df, seeds=100, min_history=30, weekdays=None, random_state=None):
+    """逐期滚动回测：每一期只用之前的开奖数据选号，与该期实际开奖号码比对奖级
+
+    df为开奖数据（需含开奖日期、星期、期号和前后区号码列，或已有号码掩码列），
+    weekdays可限定只回测某几个开奖日（如['星期三']），前min_history期只作为历史不参与回测。
+    返回长表：策略、期号、开奖日期、种子、前区命中、后区命中、奖级，确定性策略的种子记为0；
+    df含各奖级基本单注奖金列（PAYOUT_COLUMNS）时另有该期实际的奖金列。
+    """
+    df = df.sort_values('开奖日期', kind='stable').reset_index(drop=True)
+    masks = df['号码掩码'].to_numpy(np.uint64) if '号码掩码' in df else encode_draws(df)
+    codes, _ = pd.factorize(df['星期'])
+
+    targets = np.arange(min_history, len(df))
+    if weekdays is not None:
+        targets = targets[df['星期'].iloc[targets].isin(weekdays).to_numpy()]
+
+    tickets = strategy_tickets(masks, codes, targets, seeds, random_state)
+    amounts = prize_amounts(df.iloc[targets]) if set(PAYOUT_COLUMNS) <= set(df.columns) else None
+    frames = []
+    for name in STRATEGIES:
+        picks = tickets[name]
+        front_hits, back_hits = match_counts(picks, masks[targets])
+        runs, draws = np.indices(picks.shape)
+        levels = prize_levels(front_hits, back_hits)
+        frame = pd.DataFrame({
+            '策略': name,
+            '期号': df['期号'].to_numpy()[targets][draws.ravel()],
+            '开奖日期': df['开奖日期'].to_numpy()[targets][draws.ravel()],
+            '种子': runs.ravel(),
+            '前区命中': front_hits.ravel(),
+            '后区命中': back_hits.ravel(),
+            '奖级': levels.ravel(),
+        })
+        if amounts is not None:
+            frame['奖金'] = amounts[draws, levels].ravel()
+        frames.append(frame)
+    results = pd.concat(frames, ignore_index=True)
+    results['策略'] = pd.Categorical(results['策略'], categories=STRATEGIES)
+    return results
+
+
+def summarize(results):
+    """各策略的评估次数、中奖率、平均命中数（有奖金列时另含每注平均奖金）和各奖级次数"""
+    grouped = results.groupby('策略', observed=True)
+    summary = pd.DataFrame({
+        '评估次数': grouped.size(),
+        '中奖率': grouped['奖级'].apply(lambda levels: (levels > 0).mean()),
+        '平均前区命中': grouped['前区命中'].mean(),
+        '平均后区命中': grouped['后区命中'].mean(),
+    })
+    if '奖金' in results:
+        summary['平均奖金'] = grouped['奖金'].mean()
+    levels = pd.crosstab(results['策略'], results['奖级']).reindex(columns=LEVELS, fill_value=0)
+    levels.columns = [f'{level}等奖' for level in LEVELS]
+    return summary.join(levels)
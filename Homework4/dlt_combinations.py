@@ -0,0 +1,264 @@
+import json
+import os
+from math import comb
+
+import numpy as np
+import pandas as pd
+
+from dlt_draws import (BACK_MASK, BACK_NUMBERS, BACK_PICK, BACK_SHIFT, FRONT_MASK, FRONT_NUMBERS, FRONT_PICK,
+                       encode_draws, popcount)
+from dlt_store import DEFAULT_LABEL, DLT_STORE_DIR
+from dlt_tiers import PRIZE_TABLE
+
+# 组合数表 BINOM[n, k] = C(n, k)
+BINOM = np.array([[comb(n, k) for k in range(FRONT_PICK + 1)] for n in range(FRONT_NUMBERS + 1)], dtype=np.int64)
+
+FRONT_COMBINATIONS = comb(FRONT_NUMBERS, FRONT_PICK)
+BACK_COMBINATIONS = comb(BACK_NUMBERS, BACK_PICK)
+TOTAL_COMBINATIONS = FRONT_COMBINATIONS * BACK_COMBINATIONS
+
+INDEX_DIR = 'combinations'
+INDEX_VERSION = 2
+NEVER = 10  # 磁盘上表示"从未中奖"的奖级，比所有奖级都大，更新时直接取最小值
+_CHUNK_ROWS = 1 << 16  # 按前区行分块更新，每块约4MB
+FEATURE_COLUMNS = ('和值', '跨度', '奇数个数')
+_FEATURE_FILES = {'和值': 'front_sum.npy', '跨度': 'front_span.npy', '奇数个数': 'front_odd.npy'}
+
+
+def comb_rank(combos):
+    """组合数系统排名：每行k个升序排列的0起始元素 -> 该组合在全部C(n, k)个组合中的序号（colex序）"""
+    combos = np.asarray(combos, dtype=np.int64)
+    return BINOM[combos, np.arange(1, combos.shape[-1] + 1)].sum(axis=-1)
+
+
+def comb_unrank(ranks, n, k):
+    """comb_rank的逆运算，返回 [个数, k] 的升序0起始元素"""
+    ranks = np.array(ranks, dtype=np.int64, ndmin=1)
+    combos = np.empty(ranks.shape + (k,), dtype=np.int64)
+    for i in range(k, 0, -1):
+        # 第i个元素是满足 C(c, i) <= 剩余序号 的最大c
+        combos[..., i - 1] = np.searchsorted(BINOM[:n, i], ranks, side='right') - 1
+        ranks = ranks - BINOM[combos[..., i - 1], i]
+    return combos
+
+
+def rank_tickets(front, back):
+    """号码（1起始、升序）-> 全部C(35,5)×C(12,2)注中的序号：前区序号×66 + 后区序号"""
+    front = np.asarray(front, dtype=np.int64).reshape(-1, FRONT_PICK) - 1
+    back = np.asarray(back, dtype=np.int64).reshape(-1, BACK_PICK) - 1
+    return comb_rank(front) * BACK_COMBINATIONS + comb_rank(back)
+
+
+def unrank_tickets(ranks):
+    """序号 -> (前区号码[个数, 5], 后区号码[个数, 2])，号码1起始、升序"""
+    front_ranks, back_ranks = np.divmod(np.asarray(ranks, dtype=np.int64), BACK_COMBINATIONS)
+    return (comb_unrank(front_ranks, FRONT_NUMBERS, FRONT_PICK) + 1,
+            comb_unrank(back_ranks, BACK_NUMBERS, BACK_PICK) + 1)
+
+
+def _bit_rank(masks, width, pick):
+    """位掩码 -> 组合序号：取出置位的位置再排名"""
+    bits = (np.asarray(masks, dtype=np.uint64)[:, None] >> np.arange(width, dtype=np.uint64)) & np.uint64(1)
+    positions = np.nonzero(bits)[1].reshape(-1, pick)
+    return comb_rank(positions)
+
+
+def rank_masks(masks):
+    """encode_draws / encode_tickets得到的位掩码 -> 组合序号"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    front = _bit_rank(masks & FRONT_MASK, FRONT_NUMBERS, FRONT_PICK)
+    back = _bit_rank((masks >> BACK_SHIFT) & BACK_MASK, BACK_NUMBERS, BACK_PICK)
+    return front * BACK_COMBINATIONS + back
+
+
+def unrank_masks(ranks):
+    """组合序号 -> 位掩码"""
+    front, back = unrank_tickets(ranks)
+    front_bits = np.left_shift(np.uint64(1), (front - 1).astype(np.uint64))
+    back_bits = np.left_shift(np.uint64(1), (back - 1).astype(np.uint64) + BACK_SHIFT)
+    return np.bitwise_or.reduce(front_bits, axis=1) | np.bitwise_or.reduce(back_bits, axis=1)
+
+
+def _zone_masks(n, k):
+    """按序号排列的全部C(n, k)个组合的位掩码（未移位）"""
+    combos = comb_unrank(np.arange(comb(n, k)), n, k).astype(np.uint64)
+    return np.bitwise_or.reduce(np.left_shift(np.uint64(1), combos), axis=1)
+
+
+def _back_overlap():
+    """[66, 66]：两组后区组合的重合号码个数"""
+    backs = _zone_masks(BACK_NUMBERS, BACK_PICK)
+    return popcount(backs[:, None] & backs[None, :]).astype(np.intp)
+
+
+def front_features():
+    """全部前区组合的和值、跨度、奇数个数，按前区序号排列"""
+    numbers = comb_unrank(np.arange(FRONT_COMBINATIONS), FRONT_NUMBERS, FRONT_PICK) + 1
+    return {
+        '和值': numbers.sum(axis=1).astype(np.uint8),
+        '跨度': (numbers[:, -1] - numbers[:, 0]).astype(np.uint8),
+        '奇数个数': (numbers % 2).sum(axis=1).astype(np.uint8),
+    }
+
+
+class CombinationIndex:
+    """全部21,425,712注的预计算索引，数组保存在磁盘上按需映射
+
+    和值、跨度、奇数个数只与前区有关，按前区组合保存（324,632个）；
+    历史最好奖级按 [前区序号, 后区序号] 的二维int8数组保存（1为开出过，磁盘上以NEVER表示从未中奖），
+    展平后的下标就是rank_tickets的序号。筛选时先在前区特征上做向量化比较，
+    再只读取命中的前区行判断奖级条件，不需要逐注枚举。对外的接口中仍以0表示从未中奖。
+    """
+
+    def __init__(self, path, features, best, last_issue=None):
+        self.path = path
+        self.features = features
+        self.best = best
+        self.last_issue = last_issue
+        self._fronts = None
+        self._overlap = None
+
+    @classmethod
+    def build(cls, path, draws=None):
+        """建立索引文件；draws不为None时同时统计历史最好奖级"""
+        os.makedirs(path, exist_ok=True)
+        for name, values in front_features().items():
+            np.save(os.path.join(path, _FEATURE_FILES[name]), values)
+        best = np.lib.format.open_memmap(os.path.join(path, 'best_tier.npy'), mode='w+', dtype=np.int8,
+                                         shape=(FRONT_COMBINATIONS, BACK_COMBINATIONS))
+        best[:] = NEVER
+        best.flush()
+        del best
+        cls._save_meta(path, None)
+        index = cls.open(path, mode='r+')
+        if draws is not None:
+            index.sync(draws)
+        return index
+
+    @classmethod
+    def open(cls, path, mode='r'):
+        features = {name: np.load(os.path.join(path, file), mmap_mode='r') for name, file in _FEATURE_FILES.items()}
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version', 1) < INDEX_VERSION:
+            cls._upgrade(path, meta['last_issue'])
+        best = np.load(os.path.join(path, 'best_tier.npy'), mmap_mode=mode)
+        return cls(path, features, best, meta['last_issue'])
+
+    @classmethod
+    def _upgrade(cls, path, last_issue):
+        """旧版索引以0表示从未中奖，就地分块改写为NEVER（只需进行一次）"""
+        best = np.load(os.path.join(path, 'best_tier.npy'), mmap_mode='r+')
+        for start in range(0, len(best), _CHUNK_ROWS):
+            view = best[start:start + _CHUNK_ROWS]
+            view[view == 0] = NEVER
+        best.flush()
+        del best
+        cls._save_meta(path, last_issue)
+
+    @staticmethod
+    def _save_meta(path, last_issue):
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'last_issue': last_issue}, f)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    def _add_masks(self, masks):
+        """把若干期开奖并入历史最好奖级
+
+        同一后区组合的开奖先取前区命中数的最大值；按前区行分块，在映射的数组上用np.minimum就地更新，
+        不把整个数组读入内存再整体写回。
+        """
+        if self._fronts is None:
+            self._fronts = _zone_masks(FRONT_NUMBERS, FRONT_PICK)
+            self._overlap = _back_overlap()
+        masks = np.asarray(masks, dtype=np.uint64)
+        back_ranks = rank_masks(masks) % BACK_COMBINATIONS
+        groups = [(back_rank, masks[back_ranks == back_rank] & FRONT_MASK) for back_rank in np.unique(back_ranks)]
+        # 奖级表中的0（未中奖）换成NEVER，取最小值即为更好的奖级
+        prize_table = np.where(PRIZE_TABLE == 0, np.int8(NEVER), PRIZE_TABLE)
+        for start in range(0, FRONT_COMBINATIONS, _CHUNK_ROWS):
+            fronts = self._fronts[start:start + _CHUNK_ROWS]
+            view = self.best[start:start + _CHUNK_ROWS]
+            for back_rank, front_masks in groups:
+                front_hits = np.zeros(len(fronts), dtype=np.int64)
+                for mask in front_masks:
+                    np.maximum(front_hits, popcount(fronts & mask), out=front_hits)
+                np.minimum(view, prize_table[front_hits][:, self._overlap[back_rank]], out=view)
+
+    def best_counts(self):
+        """各历史最好奖级的组合数，下标为奖级（0为从未中奖），按前区行分块统计"""
+        counts = np.zeros(NEVER + 1, dtype=np.int64)
+        for start in range(0, FRONT_COMBINATIONS, _CHUNK_ROWS):
+            counts += np.bincount(np.asarray(self.best[start:start + _CHUNK_ROWS]).ravel(), minlength=NEVER + 1)
+        counts[0] = counts[NEVER]
+        return counts[:NEVER]
+
+    def sync(self, draws):
+        """并入draws中期号大于last_issue的开奖，返回新增的期数"""
+        draws = draws.sort_values('期号')
+        if self.last_issue is not None:
+            draws = draws[draws['期号'] > self.last_issue]
+        if draws.empty:
+            return 0
+        masks = draws['号码掩码'].to_numpy(np.uint64) if '号码掩码' in draws else encode_draws(draws)
+        self._add_masks(masks)
+        self.best.flush()
+        self.last_issue = int(draws['期号'].max())
+        self._save_meta(self.path, self.last_issue)
+        return len(draws)
+
+    def select(self, sum_range=None, span_range=None, odd_counts=None, best_tiers=None, never_drawn=False):
+        """向量化筛选，返回满足全部条件的组合序号（升序）
+
+        sum_range、span_range为闭区间 (下限, 上限)，odd_counts为前区奇数个数的取值列表，
+        best_tiers为历史最好奖级的取值列表（0为从未中奖），never_drawn为True时排除开出过的组合。
+        例如和值80-100且从未开出：select(sum_range=(80, 100), never_drawn=True)
+        """
+        keep = np.ones(FRONT_COMBINATIONS, dtype=bool)
+        for name, bounds in (('和值', sum_range), ('跨度', span_range)):
+            if bounds is not None:
+                values = self.features[name]
+                keep &= (values >= bounds[0]) & (values <= bounds[1])
+        if odd_counts is not None:
+            keep &= np.isin(self.features['奇数个数'], odd_counts)
+        rows = np.flatnonzero(keep)
+
+        best = self.best[rows]
+        mask = np.ones(best.shape, dtype=bool)
+        if best_tiers is not None:
+            mask &= np.isin(best, [NEVER if tier == 0 else tier for tier in best_tiers])
+        if never_drawn:
+            mask &= best != 1
+        front_rows, back_ranks = np.nonzero(mask)
+        return rows[front_rows] * BACK_COMBINATIONS + back_ranks
+
+    def describe(self, ranks):
+        """组合序号 -> 号码、特征和历史最好奖级的明细表"""
+        ranks = np.asarray(ranks, dtype=np.int64)
+        front, back = unrank_tickets(ranks)
+        front_ranks, back_ranks = np.divmod(ranks, BACK_COMBINATIONS)
+        frame = pd.DataFrame({
+            '序号': ranks,
+            '中奖号码_前区': [' '.join(f'{n:02d}' for n in row) for row in front],
+            '中奖号码_后区': [' '.join(f'{n:02d}' for n in row) for row in back],
+        })
+        for name in FEATURE_COLUMNS:
+            frame[name] = np.asarray(self.features[name])[front_ranks]
+        best = np.asarray(self.best[front_ranks, back_ranks])
+        frame['历史最好奖级'] = np.where(best == NEVER, 0, best)
+        return frame
+
+
+def combination_index_path(label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    return os.path.join(store_dir, label, INDEX_DIR)
+
+
+def update_combination_index(draws, label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    """打开已有的组合索引并并入新开奖，不存在时新建（首次需要数秒，之后每期约0.05秒）"""
+    path = combination_index_path(label, store_dir)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        index = CombinationIndex.open(path, mode='r+')
+        index.sync(draws)
+        return index
+    return CombinationIndex.build(path, draws)
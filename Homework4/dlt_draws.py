@@ -0,0 +1,125 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+# 一期开奖编码为一个uint64：低35位是前区（号码n对应第n-1位），其上12位是后区
+FRONT_NUMBERS = 35
+BACK_NUMBERS = 12
+FRONT_PICK = 5
+BACK_PICK = 2
+BACK_SHIFT = np.uint64(FRONT_NUMBERS)
+FRONT_MASK = np.uint64((1 << FRONT_NUMBERS) - 1)
+BACK_MASK = np.uint64((1 << BACK_NUMBERS) - 1)
+
+ZONES = {
+    '前区': (np.uint64(0), FRONT_MASK, FRONT_NUMBERS),
+    '后区': (BACK_SHIFT, BACK_MASK, BACK_NUMBERS),
+}
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(values):
+        """逐元素统计置位数"""
+        return np.bitwise_count(np.asarray(values, dtype=np.uint64)).astype(np.int64)
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+    def popcount(values):
+        """逐元素统计置位数（numpy<2.0时按字节查表）"""
+        values = np.ascontiguousarray(values, dtype=np.uint64)
+        return _POPCOUNT_TABLE[values.view(np.uint8).reshape(values.shape + (8,))].sum(axis=-1)
+
+
+def encode_numbers(numbers, zone='前区'):
+    """把号码序列（如 [[11, 18, 22, 25, 29], ...]）编码为该区的位掩码（已移到该区所在的位）"""
+    shift, _, width = ZONES[zone]
+    matrix = np.asarray(numbers, dtype=np.uint64)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    bits = np.left_shift(np.uint64(1), matrix - np.uint64(1))
+    return np.bitwise_or.reduce(bits, axis=1) << shift
+
+
+def parse_number_strings(strings, count):
+    """把 "11 18 22 25 29" 形式的号码列一次性拆成整数矩阵"""
+    matrix = pd.Series(strings).str.split(expand=True).astype(np.int64).to_numpy()
+    if matrix.shape[1] != count:
+        raise ValueError(f"每期应有{count}个号码，实际为{matrix.shape[1]}个")
+    return matrix
+
+
+def encode_draws(df, front_column='中奖号码_前区', back_column='中奖号码_后区'):
+    """把开奖数据编码为uint64数组，每期一个元素"""
+    front = encode_numbers(parse_number_strings(df[front_column], FRONT_PICK), '前区')
+    back = encode_numbers(parse_number_strings(df[back_column], BACK_PICK), '后区')
+    return front | back
+
+
+def encode_ticket(front, back):
+    """单注号码编码，与encode_draws的布局相同"""
+    return (encode_numbers([front], '前区') | encode_numbers([back], '后区'))[0]
+
+
+def zone_bits(masks, zone):
+    """取出某一区的位掩码（移到最低位）"""
+    shift, mask, _ = ZONES[zone]
+    return (np.asarray(masks, dtype=np.uint64) >> shift) & mask
+
+
+def decode(mask):
+    """单期掩码还原为 (前区号码列表, 后区号码列表)"""
+    mask = int(mask)
+    front = [n + 1 for n in range(FRONT_NUMBERS) if mask >> n & 1]
+    back = [n + 1 for n in range(BACK_NUMBERS) if mask >> (FRONT_NUMBERS + n) & 1]
+    return front, back
+
+
+def contains(masks, number, zone='前区'):
+    """每期是否开出了某个号码"""
+    shift, _, _ = ZONES[zone]
+    bit = np.uint64(1) << (shift + np.uint64(number - 1))
+    return (np.asarray(masks, dtype=np.uint64) & bit) != 0
+
+
+def overlap(masks, other, zone=None):
+    """两组掩码逐元素的重合号码个数，zone为None时前后区合计"""
+    common = np.asarray(masks, dtype=np.uint64) & np.asarray(other, dtype=np.uint64)
+    return popcount(common if zone is None else zone_bits(common, zone))
+
+
+def match_counts(masks, ticket):
+    """一注号码与每期开奖的 (前区命中数, 后区命中数)"""
+    common = np.asarray(masks, dtype=np.uint64) & np.uint64(ticket)
+    return popcount(common & FRONT_MASK), popcount(common >> BACK_SHIFT)
+
+
+def one_hot(masks, zone):
+    """展开为 (期数, 号码个数) 的0/1矩阵，第j列对应号码j+1"""
+    _, _, width = ZONES[zone]
+    bits = zone_bits(masks, zone)
+    return ((bits[:, None] >> np.arange(width, dtype=np.uint64)) & np.uint64(1)).astype(np.uint8)
+
+
+def explode_numbers(masks, zone):
+    """展开为长表：返回 (期的位置, 号码) 两个数组，按期的顺序、号码升序排列"""
+    rows, columns = np.nonzero(one_hot(masks, zone))
+    return rows, columns + 1
+
+
+def number_frequencies(masks, zone):
+    """各号码出现次数，下标j对应号码j+1"""
+    return one_hot(masks, zone).sum(axis=0, dtype=np.int64)
+
+
+def number_counts(masks, zone):
+    """各号码出现次数的Counter，键的插入顺序为号码首次出现的顺序
+
+    与 Counter(号码列表展开) 完全一致（号码串按升序排列时），
+    因此most_common在次数相同时的先后顺序也不变。
+    """
+    matrix = one_hot(masks, zone)
+    counts = matrix.sum(axis=0, dtype=np.int64)
+    seen = np.flatnonzero(counts)
+    first_draw = matrix[:, seen].argmax(axis=0)
+    order = seen[np.lexsort((seen, first_draw))]
+    return Counter({int(j) + 1: int(counts[j]) for j in order})
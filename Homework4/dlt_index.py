@@ -0,0 +1,143 @@
+import json
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from dlt_draws import BACK_NUMBERS, FRONT_NUMBERS, ZONES, encode_draws
+from dlt_store import DEFAULT_LABEL, DLT_STORE_DIR
+
+WINDOWS = (10, 30, 100)
+INDEX_NAME = 'hotcold.json'
+
+# 位掩码中的全部47个号码位：前区在低35位，后区在其上12位
+_WIDTH = FRONT_NUMBERS + BACK_NUMBERS
+_SHIFTS = np.arange(_WIDTH, dtype=np.uint64)
+
+
+def _bits(mask):
+    return ((np.uint64(mask) >> _SHIFTS) & np.uint64(1)).astype(np.int64)
+
+
+class HotColdIndex:
+    """逐期维护的号码冷热与遗漏索引
+
+    每个号码保存近10/30/100期的出现次数、当前遗漏（距上次开出的期数）和历史最大遗漏。
+    只保留最近max(windows)期的位掩码，新增一期时把移出窗口的那一期减掉，
+    更新代价与历史长度无关，不需要重新扫描全部开奖数据。
+    """
+
+    def __init__(self, windows=WINDOWS):
+        self.windows = tuple(windows)
+        self.recent = deque(maxlen=max(self.windows))
+        self.counts = {window: np.zeros(_WIDTH, dtype=np.int64) for window in self.windows}
+        self.gap = np.zeros(_WIDTH, dtype=np.int64)
+        self.max_gap = np.zeros(_WIDTH, dtype=np.int64)
+        self.total = 0
+        self.last_issue = None
+
+    def update(self, mask, issue=None):
+        """追加一期开奖（位掩码），按期号升序调用"""
+        bits = _bits(mask)
+        for window in self.windows:
+            self.counts[window] += bits
+            if len(self.recent) >= window:
+                self.counts[window] -= _bits(self.recent[-window])
+        self.recent.append(int(mask))
+
+        self.gap += 1
+        self.gap[bits > 0] = 0
+        np.maximum(self.max_gap, self.gap, out=self.max_gap)
+        self.total += 1
+        if issue is not None:
+            self.last_issue = int(issue)
+
+    def sync(self, draws):
+        """只追加draws中期号大于last_issue的开奖，返回新增的期数
+
+        draws是连续的若干期（如近100期），必须包含last_issue才能保证新增部分与索引之间没有缺期；
+        否则（两次运行之间开奖超过draws覆盖的期数）抛出ValueError，由调用方重建索引。
+        """
+        draws = draws.sort_values('期号')
+        if self.last_issue is not None:
+            issues = draws['期号'].to_numpy()
+            if len(issues) and issues[-1] > self.last_issue and self.last_issue not in issues:
+                raise ValueError(f"索引最后一期 {self.last_issue} 不在开奖数据中（{issues[0]}-{issues[-1]}），中间可能缺期")
+            draws = draws[draws['期号'] > self.last_issue]
+        if draws.empty:
+            return 0
+        masks = draws['号码掩码'].to_numpy(np.uint64) if '号码掩码' in draws else encode_draws(draws)
+        for mask, issue in zip(masks, draws['期号'].to_numpy()):
+            self.update(mask, issue)
+        return len(draws)
+
+    def frame(self, zone='前区'):
+        """某一区各号码的冷热与遗漏统计表，以号码为索引"""
+        shift, _, width = ZONES[zone]
+        columns = slice(int(shift), int(shift) + width)
+        data = {f'近{window}期': self.counts[window][columns] for window in self.windows}
+        data['当前遗漏'] = self.gap[columns]
+        data['最大遗漏'] = self.max_gap[columns]
+        return pd.DataFrame(data, index=pd.RangeIndex(1, width + 1, name='号码'))
+
+    def hot_cold(self, zone='前区', window=30):
+        """按窗口内出现次数的分位数分类：不低于80%分位为热号，低于30%分位为冷号，其余为温号"""
+        counts = self.frame(zone)[f'近{window}期']
+        hot = counts >= np.percentile(counts, 80)
+        cold = counts < np.percentile(counts, 30)
+        return pd.Series(np.select([hot, cold], ['热号', '冷号'], '温号'), index=counts.index, name=f'近{window}期冷热')
+
+    def to_dict(self):
+        return {
+            'windows': list(self.windows),
+            'recent': list(self.recent),
+            'counts': {str(window): counts.tolist() for window, counts in self.counts.items()},
+            'gap': self.gap.tolist(),
+            'max_gap': self.max_gap.tolist(),
+            'total': self.total,
+            'last_issue': self.last_issue,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data['windows'])
+        index.recent.extend(data['recent'])
+        index.counts = {window: np.array(data['counts'][str(window)], dtype=np.int64) for window in index.windows}
+        index.gap = np.array(data['gap'], dtype=np.int64)
+        index.max_gap = np.array(data['max_gap'], dtype=np.int64)
+        index.total = data['total']
+        index.last_issue = data['last_issue']
+        return index
+
+    def save(self, path):
+        """先写临时文件再改名，中途中断不会留下半个索引"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def index_path(label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    return os.path.join(store_dir, label, INDEX_NAME)
+
+
+def update_index(draws, label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    """读取已保存的索引，追加draws中的新开奖后写回；索引不存在或与draws之间缺期时用draws从头建立"""
+    path = index_path(label, store_dir)
+    index = HotColdIndex.load(path) if os.path.exists(path) else HotColdIndex()
+    try:
+        added = index.sync(draws)
+    except ValueError as e:
+        print(f"警告: {e}，按现有开奖数据重建冷热索引")
+        index = HotColdIndex(index.windows)
+        added = index.sync(draws)
+    if added:
+        index.save(path)
+    return index
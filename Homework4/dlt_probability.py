@@ -0,0 +1,257 @@
+from itertools import combinations
+from math import comb
+
+import numpy as np
+
+from dlt_draws import BACK_NUMBERS, BACK_PICK, FRONT_NUMBERS, FRONT_PICK, popcount
+from dlt_scoring import PAYOUT_COLUMNS
+from dlt_tiers import LEVELS, PRIZE_TABLE
+
+TICKET_PRICE = 2
+# 一等奖（基本投注）单注封顶：奖池低于1.5亿元时500万元，否则1000万元
+JACKPOT_THRESHOLD = 150_000_000
+JACKPOT_CAPS = (5_000_000, 10_000_000)
+
+_C = np.array([[comb(n, k) for k in range(FRONT_NUMBERS + 1)] for n in range(FRONT_NUMBERS + 1)], dtype=np.float64)
+_FRONT_TOTAL = comb(FRONT_NUMBERS, FRONT_PICK)
+_BACK_TOTAL = comb(BACK_NUMBERS, BACK_PICK)
+# [6, 3, 9]：(前区命中, 后区命中) 属于1..9等奖的one-hot
+_TIER_ONE_HOT = np.eye(len(LEVELS) + 1)[PRIZE_TABLE][..., 1:]
+# [6, 3, 18]：再拼上"属于1..t等奖之一"的累计形式，一次矩阵乘法同时得到各奖级和"不差于t等奖"的中奖情况
+_TIER_COLUMNS = np.concatenate([_TIER_ONE_HOT, np.cumsum(_TIER_ONE_HOT, axis=-1)], axis=-1)
+# 6进制下int64可容纳的注数
+_CODE_DIGITS = 24
+_MERGE_STATES = 1024
+
+
+def _code_layout(count, base):
+    """count注的命中数按base进制编码：第k注落在第group[k]个int64的power[k]位上
+
+    另返回 [注数, 组数] 的位权矩阵，命中数矩阵乘以它即得编码。
+    """
+    group, power = np.divmod(np.arange(count), _CODE_DIGITS)
+    power = base ** power
+    weights = np.zeros((count, group[-1] + 1), dtype=np.int64)
+    weights[np.arange(count), group] = power
+    return group, power, weights
+
+
+def _unique_codes(code, group, power, base):
+    """按编码去重，返回 (去重后解码的命中数 [行数, 注数], 每行对应的去重下标)"""
+    if code.shape[1] == 1:
+        code, inverse = np.unique(code[:, 0], return_inverse=True)
+        code = code[:, None]
+    else:
+        code, inverse = np.unique(code, axis=0, return_inverse=True)
+    return code[:, group] // power % base, inverse.ravel()
+
+
+def _unique_rows(rows, base):
+    """命中数矩阵 [行数, 注数] 去重"""
+    group, power, weights = _code_layout(rows.shape[1], base)
+    return _unique_codes(rows @ weights, group, power, base)
+
+
+def _merge(code, drawn, ways, pick):
+    """合并命中数编码和已开出个数都相同的情况，组合数相加"""
+    keys = np.column_stack([code, drawn])
+    if code.shape[1] == 1:
+        unique, inverse = np.unique(keys[:, 0] * (pick + 1) + keys[:, 1], return_inverse=True)
+        keys = np.column_stack(np.divmod(unique, pick + 1))
+    else:
+        keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    ways = np.bincount(inverse.ravel(), weights=ways, minlength=len(keys))
+    return keys[:, :-1], keys[:, -1], ways
+
+
+def _states(sizes, codes, pick):
+    """开奖号码落在各个"原子"（被同一批注单包含的号码集合）中的个数的全部可能
+
+    sizes为各原子的号码个数，codes为各原子贡献的命中数编码 [原子数, 组数]。
+    逐个原子展开，返回每种情况的 (命中数编码, 已开出个数, 组合数)，已开出个数不超过pick；
+    情况数超过_MERGE_STATES时随时合并相同的情况，注数多、原子多时情况数不会按组合爆炸。
+    其余号码落在原子之外，只影响组合数，不影响命中数。
+    """
+    code = np.zeros((1, codes.shape[1]), dtype=np.int64)
+    drawn = np.zeros(1, dtype=np.int64)
+    ways = np.ones(1)
+    for size, atom_code in zip(sizes, codes):
+        # 每种已有情况 × 该原子开出0..min(size, pick)个，去掉合计超过pick的
+        counts = np.arange(min(size, pick) + 1)
+        total = drawn[:, None] + counts
+        kept = total <= pick
+        code = (code[:, None, :] + counts[:, None] * atom_code)[kept]
+        drawn = total[kept]
+        ways = (ways[:, None] * _C[size, counts])[kept]
+        if len(code) > _MERGE_STATES:
+            code, drawn, ways = _merge(code, drawn, ways, pick)
+    return code, drawn, ways
+
+
+def _zone(entries, numbers, pick):
+    """某一区：各注在每种开奖情况下的命中数 [情况数, 注数] 及各情况的概率（前区用）"""
+    union = sorted(set().union(*entries))
+    membership = np.array([[n in entry for entry in entries] for n in union], dtype=bool).reshape(len(union), -1)
+    # 被同一批注单包含的号码可以互换，合并成一个原子
+    atoms, atom_of = np.unique(membership, axis=0, return_inverse=True)
+    sizes = np.bincount(atom_of.ravel(), minlength=len(atoms))
+
+    # 各注的命中数（0..pick）按pick+1进制编码，每_CODE_DIGITS注占一个int64
+    group, power, weights = _code_layout(len(entries), pick + 1)
+    code, drawn, ways = _states(sizes, atoms.astype(np.int64) @ weights, pick)
+    ways *= _C[numbers - len(union), pick - drawn]
+
+    # 命中数完全相同的情况对奖级没有区别，合并后再做前后区的联合计算
+    hits, inverse = _unique_codes(code, group, power, pick + 1)
+    return hits, np.bincount(inverse, weights=ways, minlength=len(hits)) / comb(numbers, pick)
+
+
+def _ways_table(numbers, pick):
+    """WAYS[m, h, i]：m个号码的复式中命中h个时，展开后恰好命中i个的单注个数 C(h, i)·C(m-h, pick-i)"""
+    sizes = np.arange(numbers + 1)[:, None, None]
+    hits = np.arange(pick + 1)[None, :, None]
+    matched = np.arange(pick + 1)[None, None, :]
+    return np.where(hits <= sizes, _C[hits, matched] * _C[np.maximum(sizes - hits, 0), pick - matched], 0)
+
+
+def _draw_masks(numbers, pick):
+    """某一区全部C(numbers, pick)种开奖号码的位掩码（号码n对应第n-1位）"""
+    return np.array([sum(1 << n for n in combo) for combo in combinations(range(numbers), pick)], dtype=np.uint64)
+
+
+def _enumerate_zone(entries, draws):
+    """组合数很少的区（后区只有66种）直接逐一枚举开奖号码，返回各注命中数 [开奖数, 注数] 及概率"""
+    masks = np.array([sum(1 << (n - 1) for n in entry) for entry in entries], dtype=np.uint64)
+    hits = popcount(draws[:, None] & masks[None, :]).astype(np.int64)
+    return hits, np.full(len(draws), 1 / len(draws))
+
+
+def _expected_table(ways, numbers, pick):
+    """EXPECTED[m, i]：m个号码的复式展开后命中i个的期望单注数（命中数服从超几何分布）"""
+    sizes = np.arange(numbers + 1)[:, None]
+    hits = np.arange(pick + 1)[None, :]
+    probability = _C[sizes, hits] * _C[np.maximum(numbers - sizes, 0), pick - hits] / comb(numbers, pick)
+    return np.einsum('mh,mhi->mi', probability, ways)
+
+
+def _class_table(ways, tiers):
+    """CLASS[m, h]：判断能否中各奖级时与命中h个等价的最小命中数
+
+    tiers[i]为单注命中i个时在另一区各命中数下的奖级（前区为PRIZE_TABLE的行，后区为列），
+    奖级完全相同的命中数合为一组；m个号码的复式命中h个时，展开后能出现的组相同，
+    则h与该最小命中数等价。例如单式前区命中0个和1个都只可能中九等奖（后区中2个时）。
+    """
+    groups = [next(j for j in range(i + 1) if (tiers[j] == tiers[i]).all()) for i in range(len(tiers))]
+    reach = np.zeros(ways.shape, dtype=bool)
+    for i, first in enumerate(groups):
+        reach[..., first] |= ways[..., i] > 0
+    table = np.empty(ways.shape[:2], dtype=np.int64)
+    for size in range(ways.shape[0]):
+        for hit in range(ways.shape[1]):
+            table[size, hit] = next(j for j in range(hit + 1) if (reach[size, j] == reach[size, hit]).all())
+    return table
+
+
+_FRONT_WAYS = _ways_table(FRONT_NUMBERS, FRONT_PICK)
+_BACK_WAYS = _ways_table(BACK_NUMBERS, BACK_PICK)
+_FRONT_CLASS = _class_table(_FRONT_WAYS, PRIZE_TABLE)
+_BACK_CLASS = _class_table(_BACK_WAYS, PRIZE_TABLE.T)
+_FRONT_EXPECTED = _expected_table(_FRONT_WAYS, FRONT_NUMBERS, FRONT_PICK)
+_BACK_EXPECTED = _expected_table(_BACK_WAYS, BACK_NUMBERS, BACK_PICK)
+_BACK_DRAWS = _draw_masks(BACK_NUMBERS, BACK_PICK)
+
+
+def _reach(hits, sizes, probability, ways, classes, pick):
+    """把命中数换成等价的最小命中数后再合并，返回 (每类情况下各注能否展开出命中i个的单注 [类数, 注数, pick+1], 各类概率)"""
+    rows, inverse = _unique_rows(classes[sizes, hits], pick + 1)
+    reach = (ways[sizes, rows] > 0).astype(np.float64)
+    return reach, np.bincount(inverse, weights=probability, minlength=len(rows))
+
+
+def evaluate(tickets, amounts=None):
+    """一组注单（可含复式、号码可重叠）各奖级的精确概率和期望收益
+
+    tickets为 [(前区号码, 后区号码), ...]，单式为5+2，复式如7+3。
+    把所有注单用到的号码按"被哪些注单包含"分成原子，逐个原子展开开奖号码落在其中的个数，
+    每种情况下各注的中奖注数由组合数直接算出，不做随机模拟。
+    各奖级期望注数是每注之和，只用前后区各自的分布；"至少中一注"需要前后区联合计算，
+    只关心能否中奖，先把对奖级等价的命中数合并（见_class_table），情况数通常减少一个数量级。
+    amounts为各奖级的单注奖金（下标为奖级，如prize_levels_from_history的结果），给出时计算期望收益。
+
+    耗时随各注命中数组合的种类增长（单核实测）：单式或7+3复式每秒约4500组，3注约2000组，
+    5注约1000组，6注随机号码约500组；10注分散在几乎全部35个前区号码上时降到每秒约40组。
+    从10-15个候选号码中选号的组合（predict_numbers的情形）比同样注数的随机号码更快。
+
+    返回字典：
+        注数        —— 展开后的单式注数
+        成本        —— 注数×2元
+        各奖级中奖概率 —— 至少中一注该奖级的概率 [9]
+        最好奖级概率  —— 最好奖级恰为0-9的概率 [10]，0为未中奖
+        各奖级期望注数 —— 各奖级中奖注数的期望 [9]
+        中奖概率     —— 至少中一注任意奖级的概率
+        期望奖金、期望收益 —— amounts给出时才有，期望收益 = 期望奖金 - 成本
+    """
+    fronts = [set(front) for front, _ in tickets]
+    backs = [set(back) for _, back in tickets]
+    front_sizes = np.array([len(front) for front in fronts])
+    back_sizes = np.array([len(back) for back in backs])
+
+    # 期望注数：每注展开后前区命中i个、后区命中j个的期望单注数只与号码个数有关，按奖级表归类求和
+    expected = np.einsum('ki,kj,ijt->t', _FRONT_EXPECTED[front_sizes], _BACK_EXPECTED[back_sizes], _TIER_ONE_HOT)
+
+    front_hits, front_probability = _zone(fronts, FRONT_NUMBERS, FRONT_PICK)
+    back_hits, back_probability = _enumerate_zone(backs, _BACK_DRAWS)
+    front_reach, front_probability = _reach(front_hits, front_sizes, front_probability, _FRONT_WAYS,
+                                            _FRONT_CLASS, FRONT_PICK)
+    back_reach, back_probability = _reach(back_hits, back_sizes, back_probability, _BACK_WAYS,
+                                          _BACK_CLASS, BACK_PICK)
+
+    # counts[前区类, (后区类, 列)]：该类开奖情况下能中各奖级（前9列）、以及能中1..t等奖（后9列）的途径数，
+    # 大于0即为能中。先把后区按奖级表展开，再对 (注, 前区命中数) 做一次矩阵乘法
+    back_tiers = np.einsum('bkj,ijt->kibt', back_reach, _TIER_COLUMNS)
+    counts = front_reach.reshape(len(front_reach), -1) @ back_tiers.reshape(front_reach[0].size, -1)
+    np.minimum(counts, 1, out=counts)
+    # 先按前区、再按后区概率加权求和，都是矩阵-向量乘法
+    won = back_probability @ (front_probability @ counts).reshape(len(back_reach), -1)
+    won, at_least = np.split(won, 2)
+    # at_least[t-1]为最好奖级不差于t（1..t等奖中至少中了一注）的概率，差分得到最好奖级恰为t的概率
+
+    size = int((_C[front_sizes, FRONT_PICK] * _C[back_sizes, BACK_PICK]).sum())
+    result = {
+        '注数': size,
+        '成本': size * TICKET_PRICE,
+        '各奖级中奖概率': won,
+        '最好奖级概率': np.concatenate([[1 - at_least[-1]], np.diff(at_least, prepend=0.0)]),
+        '各奖级期望注数': expected,
+        '中奖概率': float(at_least[-1]),
+    }
+    if amounts is not None:
+        result['期望奖金'] = float(expected @ np.asarray(amounts, dtype=np.float64)[1:])
+        result['期望收益'] = result['期望奖金'] - result['成本']
+    return result
+
+
+def ticket_probabilities():
+    """单式一注各奖级的中奖概率 [10]，下标为奖级，第0项为未中奖"""
+    front = _C[FRONT_PICK, :FRONT_PICK + 1] * _C[FRONT_NUMBERS - FRONT_PICK, FRONT_PICK - np.arange(FRONT_PICK + 1)]
+    back = _C[BACK_PICK, :BACK_PICK + 1] * _C[BACK_NUMBERS - BACK_PICK, BACK_PICK - np.arange(BACK_PICK + 1)]
+    joint = np.outer(front / _FRONT_TOTAL, back / _BACK_TOTAL)
+    return np.bincount(PRIZE_TABLE.ravel(), weights=joint.ravel(), minlength=len(LEVELS) + 1)
+
+
+def prize_levels_from_history(draws, jackpot=None):
+    """按历史开奖估计各奖级的单注奖金 [10]，下标为奖级
+
+    固定奖级取历史中位数；一、二等奖为浮动奖金，取历史上有人中奖时的中位数，
+    一等奖再按奖池（默认为最近一期的奖池奖金）对应的封顶金额截断。
+    """
+    amounts = np.zeros(len(LEVELS) + 1)
+    for level, column in zip(LEVELS, PAYOUT_COLUMNS):
+        values = draws[column].dropna()
+        values = values[values > 0]
+        amounts[level] = values.median() if len(values) else 0
+    if jackpot is None and '奖池奖金(元)' in draws:
+        jackpot = draws.sort_values('期号')['奖池奖金(元)'].iloc[-1]
+    if jackpot is not None:
+        amounts[1] = min(amounts[1], JACKPOT_CAPS[int(jackpot >= JACKPOT_THRESHOLD)])
+    return amounts
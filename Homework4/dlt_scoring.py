@@ -0,0 +1,93 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from dlt_draws import BACK_PICK, BACK_SHIFT, FRONT_MASK, FRONT_PICK, encode_numbers, popcount
+from dlt_tiers import LEVELS, PRIZE_TABLE, wide_column_names
+
+# 各奖级基本投注的单注奖金列，下标与奖级相同（load_draws可按需只读取这些列）
+PAYOUT_COLUMNS = [wide_column_names(level, 0)[1] for level in LEVELS]
+# 每块约100万个 注×期 组合，中间数组占用几十MB
+CHUNK_PAIRS = 1 << 20
+
+
+def encode_tickets(tickets):
+    """把 [[前区5个, 后区2个], ...] 或 [(前区列表, 后区列表), ...] 编码为uint64掩码数组"""
+    if len(tickets) and np.ndim(tickets[0][0]) == 1:
+        front = [numbers for numbers, _ in tickets]
+        back = [numbers for _, numbers in tickets]
+    else:
+        matrix = np.asarray(tickets, dtype=np.int64).reshape(-1, FRONT_PICK + BACK_PICK)
+        front, back = matrix[:, :FRONT_PICK], matrix[:, FRONT_PICK:]
+    return encode_numbers(front, '前区') | encode_numbers(back, '后区')
+
+
+def prize_amounts(draws):
+    """开奖数据中各期的基本单注奖金，返回 [期数, 10] 的int64数组，第0列（未中奖）为0"""
+    amounts = np.zeros((len(draws), len(LEVELS) + 1), dtype=np.int64)
+    amounts[:, 1:] = draws[PAYOUT_COLUMNS].fillna(0).to_numpy(np.int64)
+    return amounts
+
+
+def _levels(tickets, draws):
+    """一块注单与全部开奖的奖级矩阵 [注数, 期数]"""
+    common = tickets[:, None] & draws[None, :]
+    return PRIZE_TABLE[popcount(common & FRONT_MASK), popcount(common >> BACK_SHIFT)]
+
+
+def _tally(tickets, draws, amounts):
+    """一块注单在每一期各奖级的中奖注数 [期数, 10] 以及每注的总奖金"""
+    levels = _levels(tickets, draws)
+    codes = levels + (len(LEVELS) + 1) * np.arange(len(draws))[None, :]
+    counts = np.bincount(codes.ravel(), minlength=len(draws) * (len(LEVELS) + 1))
+    winnings = None
+    if amounts is not None:
+        winnings = amounts[np.arange(len(draws))[None, :], levels].sum(axis=1)
+    return counts.reshape(len(draws), len(LEVELS) + 1), winnings
+
+
+def _chunks(tickets, draws, chunk_size):
+    chunk_size = chunk_size or max(1, CHUNK_PAIRS // max(len(draws), 1))
+    return [tickets[start:start + chunk_size] for start in range(0, len(tickets), chunk_size)]
+
+
+def _run(func, chunks, draws, amounts, workers):
+    """逐块计算；workers大于1时分块交给进程池"""
+    if workers is None or workers <= 1 or len(chunks) <= 1:
+        return [func(chunk, draws, *amounts) for chunk in chunks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+        futures = [executor.submit(func, chunk, draws, *amounts) for chunk in chunks]
+        return [future.result() for future in futures]
+
+
+def score(tickets, draws, chunk_size=None, workers=None):
+    """每注号码对每期开奖的奖级，返回 [注数, 期数] 的int8矩阵，0为未中奖
+
+    tickets和draws都是encode_tickets / encode_draws得到的掩码。按注单分块计算，
+    单块的中间数组不超过CHUNK_PAIRS个元素；结果矩阵本身随注数×期数增长，
+    只需要汇总时用tally。
+    """
+    tickets = np.asarray(tickets, dtype=np.uint64)
+    draws = np.asarray(draws, dtype=np.uint64)
+    if len(tickets) == 0:
+        return np.zeros((0, len(draws)), dtype=PRIZE_TABLE.dtype)
+    return np.vstack(_run(_levels, _chunks(tickets, draws, chunk_size), draws, (), workers))
+
+
+def tally(tickets, draws, amounts=None, chunk_size=None, workers=None):
+    """整批注单逐期汇总，不生成完整的奖级矩阵，中间数组的大小与注数无关
+
+    返回 (counts, winnings)：counts[i, level] 为第i期中level等奖的注数（第0列为未中奖），
+    winnings为每注在全部期数中的基本奖金合计（amounts为prize_amounts的结果时才计算，否则为None）。
+    """
+    tickets = np.asarray(tickets, dtype=np.uint64)
+    draws = np.asarray(draws, dtype=np.uint64)
+    counts = np.zeros((len(draws), len(LEVELS) + 1), dtype=np.int64)
+    winnings = [] if amounts is not None else None
+    for chunk_counts, chunk_winnings in _run(_tally, _chunks(tickets, draws, chunk_size), draws, (amounts,), workers):
+        counts += chunk_counts
+        if winnings is not None:
+            winnings.append(chunk_winnings)
+    if winnings is not None:
+        winnings = np.concatenate(winnings) if winnings else np.zeros(0, dtype=np.int64)
+    return counts, winnings
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from dlt_draws import BACK_NUMBERS, FRONT_NUMBERS, one_hot
+
+FRONT_LABELS = range(1, FRONT_NUMBERS + 1)
+BACK_LABELS = range(1, BACK_NUMBERS + 1)
+OVERALL = '整体'
+
+
+def _group_codes(keys, n):
+    """分组键 -> (分组标签, 每期所属分组的下标)；keys为None时整体作为一组
+
+    与groupby一样丢弃分组键为空（NaN/None）的期，这些期的下标为-1。
+    """
+    if keys is None:
+        return [None], np.zeros(n, dtype=np.intp)
+    if isinstance(keys, pd.DataFrame):
+        # 多个分组维度（如年份+星期）时以元组作为分组标签
+        valid = keys.notna().all(axis=1).to_numpy()
+        keys = pd.Series(list(keys.itertuples(index=False, name=None)))
+    else:
+        keys = pd.Series(keys).reset_index(drop=True)
+        valid = keys.notna().to_numpy()
+    codes = np.full(n, -1, dtype=np.intp)
+    valid_codes, labels = pd.factorize(keys[valid], sort=True)
+    codes[valid] = valid_codes
+    return list(labels), codes
+
+
+def grouped_cooccurrence(masks, keys=None):
+    """按分组计算号码同现次数
+
+    返回 (分组标签, 前区×后区[组,35,12], 前区×前区[组,35,35], 后区×后区[组,12,12])。
+    先构造一次前区、后区拼接的one-hot矩阵X（期数×47），按分组排序后
+    每组一次矩阵乘法X_g.T @ X_g，三块同现矩阵都取自这个47×47的结果；
+    中间数组只有X本身，内存不随分组数增长。同区矩阵的对角线就是各号码的出现次数。
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    labels, codes = _group_codes(keys, len(masks))
+    onehot = np.hstack([one_hot(masks, '前区'), one_hot(masks, '后区')]).astype(np.float64)
+
+    kept = np.flatnonzero(codes >= 0)
+    order = kept[np.argsort(codes[kept], kind='stable')]
+    sizes = np.bincount(codes[kept], minlength=len(labels))
+    counts = np.zeros((len(labels), onehot.shape[1], onehot.shape[1]))
+    for i, rows in enumerate(np.split(onehot[order], np.cumsum(sizes)[:-1])):
+        counts[i] = rows.T @ rows
+    counts = counts.astype(np.int64)
+
+    front, back = slice(0, FRONT_NUMBERS), slice(FRONT_NUMBERS, None)
+    return labels, counts[:, front, back], counts[:, front, front], counts[:, back, back]
+
+
+def cooccurrence(masks):
+    """整体的 (前区×后区, 前区×前区, 后区×后区) 同现次数矩阵"""
+    _, front_back, front_front, back_back = grouped_cooccurrence(masks)
+    return front_back[0], front_front[0], back_back[0]
+
+
+def rolling_cooccurrence(masks, window):
+    """每期及其之前共window期内的前区×后区同现次数，返回[期数,35,12]
+
+    对逐期外积做一次累加，窗口计数为两个前缀和之差。
+    """
+    if window < 1:
+        raise ValueError(f"window必须不小于1，当前为{window}")
+    masks = np.asarray(masks, dtype=np.uint64)
+    front = one_hot(masks, '前区').astype(np.int32)
+    back = one_hot(masks, '后区').astype(np.int32)
+    cumulative = np.cumsum(front[:, :, None] * back[:, None, :], axis=0)
+    result = cumulative.copy()
+    result[window:] -= cumulative[:-window]
+    return result
+
+
+def cooccurrence_frame(matrix, zones=('前区', '后区')):
+    """把同现矩阵包装成以号码为行列标签的DataFrame，与原heatmap_data的布局相同"""
+    labels = {'前区': FRONT_LABELS, '后区': BACK_LABELS}
+    return pd.DataFrame(matrix, index=labels[zones[0]], columns=labels[zones[1]])
+
+
+def front_back_pair_counts(masks):
+    """前区-后区号码组合的出现次数字典，只含出现过的组合
+
+    键的插入顺序为组合首次出现的顺序（同一期内前区、后区号码各自升序），
+    与逐期三重循环累加得到的字典一致，按次数排序时并列项的先后也不变。
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    front = one_hot(masks, '前区').astype(bool)
+    back = one_hot(masks, '后区').astype(bool)
+    present = front[:, :, None] & back[:, None, :]
+    counts = present.sum(axis=0)
+    f, b = np.nonzero(counts)
+    first_draw = present[:, f, b].argmax(axis=0)
+    order = np.lexsort((b, f, first_draw))
+    return {(int(f[i]) + 1, int(b[i]) + 1): int(counts[f[i], b[i]]) for i in order}
+
+
+def _frequency_series(counts):
+    """与 value_counts().sort_index() 的结果相同：只含出现过的号码，按号码排序"""
+    numbers = np.flatnonzero(counts)
+    return pd.Series(counts[numbers], index=numbers + 1, name='count')
+
+
+def grouped_stats(masks, keys=None):
+    """一次计算所有分组以及整体的频率统计
+
+    返回 {分组标签: {'前区': Series, '后区': Series, '前后区组合': DataFrame}}，
+    整体统计的标签为OVERALL。各组频率取自grouped_cooccurrence同区矩阵的对角线，
+    整体结果由各组相加得到，不再重新扫描数据。keys可以是Series或多列DataFrame；
+    分组键为空的期不属于任何分组，但仍计入整体（此时整体单独计算）。
+    """
+    labels, front_back, front_front, back_back = grouped_cooccurrence(masks, keys)
+    front = np.diagonal(front_front, axis1=1, axis2=2)
+    back = np.diagonal(back_back, axis1=1, axis2=2)
+
+    tables = {OVERALL: (front.sum(axis=0), back.sum(axis=0), front_back.sum(axis=0))}
+    if keys is not None and pd.DataFrame(keys).isna().to_numpy().any():
+        _, overall_front_back, overall_front, overall_back = grouped_cooccurrence(masks)
+        tables[OVERALL] = (np.diagonal(overall_front[0]), np.diagonal(overall_back[0]), overall_front_back[0])
+    if keys is not None:
+        for i, label in enumerate(labels):
+            tables[label] = (front[i], back[i], front_back[i])
+    return {
+        label: {
+            '前区': _frequency_series(front_counts),
+            '后区': _frequency_series(back_counts),
+            '前后区组合': cooccurrence_frame(combo),
+        }
+        for label, (front_counts, back_counts, combo) in tables.items()
+    }
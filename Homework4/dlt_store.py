@@ -0,0 +1,153 @@
+import csv
+import os
+import re
+import sys
+
+import pandas as pd
+
+from dlt_tiers import (WIDE_PRIZE_COLUMNS, load_tiers, pa, pivot_wide, pq, require_pyarrow, save_tiers,
+                       wide_to_tiers)
+
+# 大乐透数据以Parquet为主存储：每期一行的开奖表 + 奖级长表，CSV/Excel只在需要时导出
+DLT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dlt_data')
+DEFAULT_LABEL = '近100期'
+HISTORY_LABEL = '全部历史'  # Homework4_1_1.py --backfill 写入的数据集
+
+DRAW_COLUMNS = [
+    '期号', '详情页链接', '开奖日期', '星期', '中奖号码_前区', '中奖号码_后区',
+    '出球顺序_前区', '出球顺序_后区', '总销售额(元)', '奖池奖金(元)'
+]
+EXPORT_COLUMNS = DRAW_COLUMNS + WIDE_PRIZE_COLUMNS
+
+DRAW_SCHEMA = None if pa is None else pa.schema([
+    ('期号', pa.int64()),
+    ('详情页链接', pa.string()),
+    ('开奖日期', pa.timestamp('ns')),
+    ('星期', pa.dictionary(pa.int8(), pa.string())),
+    ('中奖号码_前区', pa.string()),
+    ('中奖号码_后区', pa.string()),
+    ('出球顺序_前区', pa.string()),
+    ('出球顺序_后区', pa.string()),
+    ('总销售额(元)', pa.int64()),
+    ('奖池奖金(元)', pa.int64()),
+])
+
+
+def cli_label(argv=None):
+    """分析脚本要读取的数据集：命令行带--history时读取全部历史，否则读取近100期"""
+    return HISTORY_LABEL if '--history' in (sys.argv if argv is None else argv) else DEFAULT_LABEL
+
+
+def export_name(label=DEFAULT_LABEL, suffix='.csv'):
+    """导出文件名，与原CSV相同，如 近100期大乐透开奖数据和中奖情况.csv"""
+    return f'{label}大乐透开奖数据和中奖情况{suffix}'
+
+
+def store_paths(label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    base = os.path.join(store_dir, label)
+    return os.path.join(base, 'draws.parquet'), os.path.join(base, 'tiers.parquet')
+
+
+def store_exists(label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    return pa is not None and all(os.path.exists(path) for path in store_paths(label, store_dir))
+
+
+def save_store(draws, tiers, label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    """写入开奖表和奖级长表，draws只需包含DRAW_COLUMNS"""
+    require_pyarrow()
+    draws_path, tiers_path = store_paths(label, store_dir)
+    os.makedirs(os.path.dirname(draws_path), exist_ok=True)
+    frame = draws[DRAW_COLUMNS].copy()
+    frame['期号'] = frame['期号'].astype('int64')
+    frame['开奖日期'] = pd.to_datetime(frame['开奖日期'])
+    pq.write_table(pa.Table.from_pandas(frame, schema=DRAW_SCHEMA, preserve_index=False), draws_path)
+    save_tiers(tiers, tiers_path)
+    return os.path.dirname(draws_path)
+
+
+def _tier_levels(columns):
+    levels = set()
+    for column in columns:
+        match = re.match(r'(\d)等奖_', column)
+        if match:
+            levels.add(int(match.group(1)))
+    return sorted(levels)
+
+
+def _attach_tiers(draws, tiers_path, columns):
+    """按需从奖级长表透视出宽表列，只读取涉及的奖级"""
+    tier_columns = [column for column in columns if column in WIDE_PRIZE_COLUMNS]
+    if not tier_columns:
+        return draws
+    tiers = load_tiers(tiers_path, levels=_tier_levels(tier_columns))
+    wide = pivot_wide(tiers, issues=draws['期号'])
+    return pd.concat([draws, pd.DataFrame(wide[tier_columns].to_numpy(), columns=tier_columns, index=draws.index)],
+                     axis=1)
+
+
+def load_draws(columns=None, label=DEFAULT_LABEL, fallback_csv=None, store_dir=DLT_STORE_DIR):
+    """读取大乐透开奖数据，列名与原CSV相同，默认返回全部列
+
+    优先读取Parquet主存储，只扫描需要的列和奖级；主存储不存在时读取fallback_csv。
+    """
+    columns = list(columns or EXPORT_COLUMNS)
+    if store_exists(label, store_dir):
+        draws_path, tiers_path = store_paths(label, store_dir)
+        draw_columns = [column for column in DRAW_COLUMNS if column in columns or column == '期号']
+        draws = pq.read_table(draws_path, columns=draw_columns).to_pandas()
+        if '星期' in draws:
+            draws['星期'] = draws['星期'].astype(str)
+        return _attach_tiers(draws, tiers_path, columns)[columns]
+
+    if fallback_csv is not None and os.path.exists(fallback_csv):
+        df = pd.read_csv(fallback_csv, usecols=columns, thousands=',')
+        if '开奖日期' in df:
+            df['开奖日期'] = pd.to_datetime(df['开奖日期'])
+        return df[columns]
+    raise FileNotFoundError(f"找不到大乐透数据：{os.path.dirname(store_paths(label, store_dir)[0])}，请先运行Homework4_1_1.py")
+
+
+def iter_export_batches(label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR, batch_size=1000):
+    """按批生成原CSV布局（70余列）的DataFrame
+
+    每批只读取这批期号的奖级记录，整张宽表和奖级长表都不会同时出现在内存中。
+    """
+    require_pyarrow()
+    draws_path, tiers_path = store_paths(label, store_dir)
+    for batch in pq.ParquetFile(draws_path).iter_batches(batch_size=batch_size, columns=DRAW_COLUMNS):
+        draws = batch.to_pandas()
+        draws['星期'] = draws['星期'].astype(str)
+        tiers = load_tiers(tiers_path, issues=draws['期号'])
+        wide = pivot_wide(tiers, issues=draws['期号'])
+        yield pd.concat([draws, pd.DataFrame(wide.to_numpy(), columns=WIDE_PRIZE_COLUMNS, index=draws.index)], axis=1)
+
+
+def export_csv(path, label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    with open(path, 'w', newline='', encoding='utf_8_sig') as f:
+        csv.writer(f).writerow(EXPORT_COLUMNS)
+        for frame in iter_export_batches(label, store_dir):
+            frame.to_csv(f, header=False, index=False)
+    return path
+
+
+def export_excel(path, label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    """用openpyxl的write_only模式逐行流式写出，内存占用与总期数无关"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(EXPORT_COLUMNS)
+    for frame in iter_export_batches(label, store_dir):
+        values = [frame[column].tolist() for column in EXPORT_COLUMNS]
+        for row in zip(*values):
+            sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+def import_csv(csv_path, label=DEFAULT_LABEL, store_dir=DLT_STORE_DIR):
+    """把已有的宽表CSV（原 近100期大乐透开奖数据和中奖情况.csv）导入主存储，无需重新爬取"""
+    df = pd.read_csv(csv_path, thousands=',')
+    save_store(df, wide_to_tiers(df), label, store_dir)
+    print(f"已导入 {csv_path}，共 {len(df)} 期")
+    return df
@@ -0,0 +1,206 @@
+import os
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from dlt_amounts import normalize_amounts
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+# 接口字段 -> 投注类型；派奖和追加派奖只有1-2等奖才有
+BET_TYPES = ['基本', '追加', '派奖', '追加派奖']
+BET_FIELDS = {
+    'baseBetWinner': 0,
+    'addToBetWinner': 1,
+    'addToBetWinner2': 2,
+    'addToBetWinner3': 3,
+}
+BONUS_LEVELS = (1, 2)
+LEVELS = range(1, 10)
+
+# 中奖规则：(前区命中数, 后区命中数) -> 奖级，0表示未中奖
+PRIZE_RULES = {
+    1: [(5, 2)],
+    2: [(5, 1)],
+    3: [(5, 0)],
+    4: [(4, 2)],
+    5: [(4, 1)],
+    6: [(3, 2)],
+    7: [(4, 0)],
+    8: [(3, 1), (2, 2)],
+    9: [(3, 0), (2, 1), (1, 2), (0, 2)],
+}
+PRIZE_TABLE = np.zeros((6, 3), dtype=np.int8)
+for _level, _hits in PRIZE_RULES.items():
+    for _front_hits, _back_hits in _hits:
+        PRIZE_TABLE[_front_hits, _back_hits] = _level
+
+TIER_COLUMNS = ['期号', '奖级', '投注类型', '注数', '单注奖金', '总奖金']
+
+
+def wide_column_names(level, bet_code):
+    """宽表中某奖级某投注类型的三列：注数、单注奖金、总奖金"""
+    bet = BET_TYPES[bet_code]
+    if bet_code < 2:
+        return [f'{level}等奖_{bet}注数', f'{level}等奖_{bet}单注奖金(元)', f'{level}等奖_{bet}总奖金(元)']
+    return [f'{level}等奖_{bet}注数', f'{level}等奖_{bet}单注金额(元)', f'{level}等奖_{bet}总金额(元)']
+
+
+def _wide_layout():
+    columns = []
+    positions = {}
+    for level in LEVELS:
+        for bet_code in range(len(BET_TYPES)):
+            if bet_code >= 2 and level not in BONUS_LEVELS:
+                continue
+            positions[(level, bet_code)] = len(columns)
+            columns.extend(wide_column_names(level, bet_code))
+    return columns, positions
+
+
+# 与原先parse_winner_details生成的70余列完全相同的列顺序
+WIDE_PRIZE_COLUMNS, WIDE_POSITIONS = _wide_layout()
+
+# (奖级, 投注类型) -> 宽表中第一列的位置，无对应列时为-1，用于向量化透视
+_POSITION_LOOKUP = np.full((10, len(BET_TYPES)), -1, dtype=np.int64)
+for (_level, _bet_code), _position in WIDE_POSITIONS.items():
+    _POSITION_LOOKUP[_level, _bet_code] = _position
+
+
+def prize_levels(front_hits, back_hits):
+    """由前区、后区命中数查表得到奖级（逐元素，0为未中奖）"""
+    return PRIZE_TABLE[np.asarray(front_hits), np.asarray(back_hits)]
+
+
+class TierTableBuilder:
+    """逐期追加奖级数据，列式存放在类型化数组中
+
+    每个出现的(奖级, 投注类型)只占一行，不再为每期构造70余个键的字典。
+    注数和奖金保留接口原始值，在to_frame时整列一次性转换为整数。
+    """
+
+    def __init__(self):
+        self.issue = array('q')
+        self.level = array('b')
+        self.bet_type = array('b')
+        self.count = []
+        self.unit_prize = []
+        self.total = []
+
+    def __len__(self):
+        return len(self.issue)
+
+    def add(self, issue, tiers):
+        """tiers为(奖级, 投注类型编号, 注数, 单注奖金, 总奖金)元组的序列，金额可以是带逗号的字符串"""
+        issue = int(issue)
+        for level, bet_code, count, unit_prize, total in tiers:
+            self.issue.append(issue)
+            self.level.append(level)
+            self.bet_type.append(bet_code)
+            self.count.append(count)
+            self.unit_prize.append(unit_prize)
+            self.total.append(total)
+
+    def to_frame(self):
+        amounts = {}
+        for name, values in (('注数', self.count), ('单注奖金', self.unit_prize), ('总奖金', self.total)):
+            amounts[name], invalid = normalize_amounts(values)
+            if invalid.any():
+                print(f"警告: {name}中有 {int(invalid.sum())} 个值无法解析，已按0处理")
+        return pd.DataFrame({
+            '期号': np.frombuffer(self.issue, dtype=np.int64).copy(),
+            '奖级': np.frombuffer(self.level, dtype=np.int8).copy(),
+            '投注类型': pd.Categorical.from_codes(np.frombuffer(self.bet_type, dtype=np.int8), BET_TYPES),
+            **amounts,
+        })
+
+
+def pivot_wide(tiers, issues=None):
+    """把奖级长表透视成每期一行的宽表（原70余列布局），缺失的奖级补0
+
+    issues指定输出的行及其顺序，默认为长表中出现过的期号（升序）。
+    """
+    issue_values = tiers['期号'].to_numpy(dtype=np.int64)
+    if issues is None:
+        index = np.unique(issue_values)
+    else:
+        index = np.asarray(issues, dtype=np.int64)
+
+    matrix = np.zeros((len(index), len(WIDE_PRIZE_COLUMNS)), dtype=np.int64)
+    if len(index) == 0:
+        # 没有要输出的期号时长表中的记录全部忽略，直接返回空宽表
+        return pd.DataFrame(matrix, index=pd.Index(index, name='期号'), columns=WIDE_PRIZE_COLUMNS)
+
+    order = np.argsort(index, kind='stable')
+    found = np.searchsorted(index[order], issue_values)
+    found = np.clip(found, 0, len(index) - 1)
+    valid = index[order][found] == issue_values
+    rows = order[found]
+
+    levels = tiers['奖级'].to_numpy(dtype=np.int64)
+    bet_codes = tiers['投注类型'].cat.codes.to_numpy(dtype=np.int64)
+    columns = _POSITION_LOOKUP[levels, bet_codes]
+    valid &= columns >= 0
+    rows, columns = rows[valid], columns[valid]
+
+    for offset, name in enumerate(('注数', '单注奖金', '总奖金')):
+        matrix[rows, columns + offset] = tiers[name].to_numpy(dtype=np.int64)[valid]
+    return pd.DataFrame(matrix, index=pd.Index(index, name='期号'), columns=WIDE_PRIZE_COLUMNS)
+
+
+def wide_to_tiers(wide):
+    """pivot_wide的逆操作：把每期一行的宽表拆回奖级长表，全为0的奖级不保留"""
+    issues = wide['期号'].to_numpy(dtype=np.int64)
+    parts = []
+    for (level, bet_code), position in WIDE_POSITIONS.items():
+        names = WIDE_PRIZE_COLUMNS[position:position + 3]
+        if not all(name in wide for name in names):
+            continue
+        values = wide[names].fillna(0).to_numpy(dtype=np.int64)
+        keep = values.any(axis=1)
+        parts.append(pd.DataFrame({
+            '期号': issues[keep],
+            '奖级': np.full(keep.sum(), level, dtype=np.int8),
+            '投注类型': pd.Categorical.from_codes(np.full(keep.sum(), bet_code, dtype=np.int8), BET_TYPES),
+            '注数': values[keep, 0],
+            '单注奖金': values[keep, 1],
+            '总奖金': values[keep, 2],
+        }))
+    if not parts:
+        return TierTableBuilder().to_frame()
+    return pd.concat(parts, ignore_index=True)
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("奖级Parquet存储需要安装pyarrow: pip install pyarrow")
+
+
+def save_tiers(tiers, path, row_group_size=10000):
+    """按期号排序后分row group写出，按期号过滤读取时可以借助各row group的统计信息跳过不相关的部分"""
+    require_pyarrow()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tiers = tiers.sort_values('期号', kind='stable')
+    pq.write_table(pa.Table.from_pandas(tiers, preserve_index=False), path, row_group_size=row_group_size)
+
+
+def load_tiers(path, levels=None, bet_types=None, columns=None, issues=None):
+    """读取奖级长表，只扫描需要的奖级、投注类型和期号，例如 load_tiers(path, levels=[1, 2], bet_types=['基本'])"""
+    require_pyarrow()
+    dataset = ds.dataset(path, format='parquet')
+    condition = None
+    if issues is not None:
+        condition = ds.field('期号').isin([int(issue) for issue in issues])
+    if levels is not None:
+        level_filter = ds.field('奖级').isin([int(level) for level in levels])
+        condition = level_filter if condition is None else condition & level_filter
+    if bet_types is not None:
+        bet_filter = ds.field('投注类型').isin(list(bet_types))
+        condition = bet_filter if condition is None else condition & bet_filter
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
@@ -0,0 +1,369 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 可选的高速JSON后端，未安装时退回标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# 各JSON后端的解析异常：json和orjson的异常是ValueError的子类，msgspec的DecodeError不是
+JSON_DECODE_ERRORS = (ValueError,) if msgspec is None else (ValueError, msgspec.DecodeError)
+
+
+def create_session(pool_size=10, headers=None):
+    """创建带连接池的会话，所有线程共用同一组keep-alive连接"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+class RateLimiter:
+    """令牌桶限速器：平均每秒最多rate个请求，允许burst个突发请求"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RandomDelay:
+    """随机延时，接口与RateLimiter相同，用于替代请求间的time.sleep(random.uniform(...))"""
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def acquire(self):
+        time.sleep(random.uniform(self.low, self.high))
+
+
+class HostLimiter:
+    """按主机限制并发连接数"""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self.semaphores[host]
+
+
+def throttled_get(session, url, rate_limiter=None, host_limiter=None, **kwargs):
+    """在限速和单主机并发上限之内发送GET请求"""
+    if rate_limiter is not None:
+        rate_limiter.acquire()
+    if host_limiter is None:
+        return session.get(url, **kwargs)
+    with host_limiter.get(url):
+        return session.get(url, **kwargs)
+
+
+# 服务器限流或临时故障时返回的状态码，值得退避后重试
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def with_backoff(func, *args, retries=3, base_delay=1.0, max_delay=30.0, **kwargs):
+    """调用func(*args, **kwargs)，网络异常或可重试状态码时按指数退避（带随机抖动）重试
+
+    最后一次尝试的异常会原样抛出，状态码则原样返回给调用方处理。
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = func(*args, **kwargs)
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            reason = str(e)
+        else:
+            if getattr(response, 'status_code', 200) not in RETRY_STATUS or attempt == retries:
+                return response
+            reason = f"状态码 {response.status_code}"
+        wait = min(max_delay, base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        print(f"  请求失败（{reason}），{wait:.1f}秒后第{attempt + 1}次重试")
+        time.sleep(wait)
+
+
+def fetch_concurrently(func, tasks, max_workers=8):
+    """用有界线程池执行func(*task)，结果顺序与tasks一致"""
+    tasks = list(tasks)
+    if max_workers <= 1:
+        return [func(*task) for task in tasks]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda task: func(*task), tasks))
+
+
+# 按月份分页的历史数据不会再变化，永久缓存（但当月结束前缓存的页面不完整，需要重新获取）；
+# 当月数据每6小时重新验证一次
+def month_cache_policy(year, month):
+    """按月份页面的缓存参数，直接展开传给ResponseCache.get"""
+    today = date.today()
+    if (year, month) >= (today.year, today.month):
+        return {'ttl': 6 * 3600}
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    return {'ttl': None, 'fresh_after': next_month.timestamp()}
+
+
+def json_loads(data):
+    """用最快的可用后端解析JSON（orjson > msgspec > json），data可以是bytes或memoryview"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return msgspec.json.decode(data)
+    return json.loads(bytes(data))
+
+
+def loads_jsonp(content):
+    """解析JSONP响应 callback({...}); ，也兼容不带回调的纯JSON
+
+    只从开头找第一个'('、从末尾找最后一个')'来定位JSON边界，
+    通过memoryview切片交给JSON后端，不生成中间字符串。
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    start = 0
+    while start < len(content) and content[start] in b' \t\r\n\xef\xbb\xbf':
+        start += 1
+    end = len(content)
+    if start < end and content[start] not in b'{[':
+        paren = content.find(b'(', start)
+        close = content.rfind(b')')
+        if paren == -1 or close < paren:
+            raise ValueError(f"不是有效的JSONP响应: {content[:100]!r}")
+        start, end = paren + 1, close
+    try:
+        return json_loads(memoryview(content)[start:end])
+    except JSON_DECODE_ERRORS as e:
+        raise ValueError(f"JSON解析失败: {e}") from e
+
+
+class CachedResponse:
+    """缓存中的响应，提供爬虫用到的requests.Response接口"""
+
+    def __init__(self, url, status_code, content, headers, encoding, from_cache):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class ResponseCache:
+    """磁盘HTTP响应缓存
+
+    以URL和参数为键，响应体gzip压缩存储。ttl为None表示永不过期（历史数据），
+    fresh_after指定时间戳之前抓取的条目一律视为过期（例如当时数据尚未完整），
+    过期后若服务器提供了ETag/Last-Modified则发送条件请求，304时直接复用缓存。
+    缓存总大小超过max_bytes时按最近访问时间淘汰（LRU）。
+    缓存目录在第一次写入时才创建；总大小在第一次写入时扫描一次，之后按写入增量累计，
+    只有超过max_bytes时才重新扫描目录进行淘汰。
+    """
+
+    def __init__(self, cache_dir, max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.size = None  # 缓存响应体的总字节数，第一次写入时才扫描目录得到
+
+    def key(self, url, params=None, ignore_params=()):
+        items = sorted((str(k), str(v)) for k, v in (params or {}).items() if k not in ignore_params)
+        raw = json.dumps([url, items], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.gz'
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(body_path, 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, content
+
+    def _write_meta(self, key, meta):
+        meta_path, _ = self._paths(key)
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def _store(self, key, response):
+        _, body_path = self._paths(key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        try:
+            added = os.path.getsize(tmp_path) - os.path.getsize(body_path)
+        except OSError:
+            added = os.path.getsize(tmp_path)
+        os.replace(tmp_path, body_path)
+        meta = {
+            'url': response.url,
+            'status_code': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')},
+            'encoding': response.encoding or response.apparent_encoding,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }
+        self._write_meta(key, meta)
+        self._grow(added)
+        return meta
+
+    def _grow(self, added):
+        """累计缓存大小，超过max_bytes时才淘汰"""
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self._entries())
+            else:
+                self.size += added
+            over = self.size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _touch(self, key):
+        _, body_path = self._paths(key)
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _fresh(meta, ttl, fresh_after):
+        if fresh_after is not None and meta['fetched_at'] < fresh_after:
+            return False
+        return ttl is None or time.time() - meta['fetched_at'] < ttl
+
+    def is_fresh(self, url, params=None, ttl=None, ignore_params=(), fresh_after=None):
+        meta_path, _ = self._paths(self.key(url, params, ignore_params))
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return self._fresh(meta, ttl, fresh_after)
+
+    def get(self, url, session=None, params=None, headers=None, ttl=None, ignore_params=(),
+            fresh_after=None, rate_limiter=None, host_limiter=None, **kwargs):
+        """带缓存的GET请求，只有真正访问网络时才受限速器约束"""
+        key = self.key(url, params, ignore_params)
+        meta, content = self._load(key)
+
+        if meta is not None and self._fresh(meta, ttl, fresh_after):
+            self._touch(key)
+            return CachedResponse(meta['url'], meta['status_code'], content, meta['headers'], meta['encoding'], True)
+
+        request_headers = dict(headers or {})
+        if meta is not None:
+            if meta.get('etag'):
+                request_headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                request_headers['If-Modified-Since'] = meta['last_modified']
+
+        response = throttled_get(session or requests, url, rate_limiter, host_limiter,
+                                 params=params, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and meta is not None:
+            meta['fetched_at'] = time.time()
+            self._write_meta(key, meta)
+            self._touch(key)
+            return CachedResponse(meta['url'], meta['status_code'], content, meta['headers'], meta['encoding'], True)
+
+        if response.status_code != 200:
+            return response
+
+        meta = self._store(key, response)
+        return CachedResponse(meta['url'], meta['status_code'], response.content, meta['headers'], meta['encoding'], False)
+
+    def _entries(self):
+        """[(最近访问时间, 字节数, 键), ...]：缓存目录中的全部响应体"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.gz'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-3]))
+        return entries
+
+    def evict(self):
+        """缓存超过容量上限时，删除最久未访问的条目，并按实际剩余大小校正累计值"""
+        with self.lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+            self.size = total
+
+
+# 所有爬虫共用的默认缓存目录
+default_cache = ResponseCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.http_cache'))
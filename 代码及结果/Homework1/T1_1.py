@@ -1,7 +1,9 @@
-import requests
+import os
+import sys
 import pandas as pd
-from time import sleep
-import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from crawl_utils import RandomDelay, default_cache
 
 # 初始化数据存储列表
 all_data = []
@@ -24,13 +26,11 @@ def get_school(character):
     else:
         return en_school
 
+# 随机等待防止反爬（命中缓存时不等待）
+delay = RandomDelay(1.5, 3)
+
 # 循环请求所有页面
 for page in range(1, 7):
-    # 随机等待防止反爬
-    sleep_time = random.uniform(1.5, 3)
-    print(f'等待 {sleep_time:.2f} 秒...')
-    sleep(sleep_time)
-
     # 计算偏移量
     offset = (page - 1) * 200
     url = f'https://www.hurun.net/zh-CN/Rank/HsRankDetailsList?num=ODBYW2BI&search=&offset={offset}&limit=200'
@@ -45,7 +45,8 @@ for page in range(1, 7):
 
     try:
         print(f'正在爬取第 {page} 页...')
-        response = requests.get(url, headers=headers, timeout=10)
+        # 榜单每年发布一次，缓存一周
+        response = default_cache.get(url, headers=headers, timeout=10, ttl=7 * 24 * 3600, rate_limiter=delay)
         response.raise_for_status()  # 检查HTTP错误
 
         json_data = response.json()